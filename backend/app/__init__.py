@@ -2,6 +2,9 @@ from flask import Flask
 from flask_smorest import Api  # Import Flask-Smorest API
 from .config import config_by_name
 from .db import db, migrate  # Import db a migrate z db.py
+from .compression import compress  # Komprese odpovědí (gzip/brotli/zstd)
+from .admission import admission  # Řízení přístupu a odmítání zátěže
+from .sharding import shards  # Volitelný sharding tabulky uživatelů
 import os
 
 
@@ -16,10 +19,15 @@ def create_app(config_name=None, config_override=None):
         app.config.from_object(config_override)
     else:
         app.config.from_object(config_by_name[config_name])
+    # Název konfigurace potřebují procesy workerů, které si vytváří vlastní aplikaci
+    app.config["CONFIG_NAME"] = config_name
 
     # Inicializace rozšíření s aplikací
     db.init_app(app)
     migrate.init_app(app, db)
+    compress.init_app(app)
+    admission.init_app(app)
+    shards.init_app(app)
 
     # Inicializace Flask-Smorest
     api = Api(app)
@@ -31,6 +39,11 @@ def create_app(config_name=None, config_override=None):
 
     # Zde můžete přidat další blueprinty (např. pro webové rozhraní, pokud by bylo)
 
+    # Registrace příkazů pro Flask CLI (`flask <příkaz>`)
+    from .commands import register_commands
+
+    register_commands(app)
+
     # Shell kontext pro `flask shell`
     @app.shell_context_processor
     def make_shell_context():
@@ -0,0 +1,207 @@
+# Tento soubor implementuje řízení přístupu (admission control) a odmítání zátěže
+# (load shedding) pro API.
+#
+# Když databáze zpomalí, požadavky se hromadí v čekání na spojení z poolu SQLAlchemy
+# a nakonec všechny najednou vyprší. Místo toho sledujeme počet rozpracovaných
+# požadavků, zaplnění poolu a latenci a udržujeme adaptivní limit souběžnosti.
+# Požadavky nad limitem rychle odmítneme odpovědí 503 s hlavičkou Retry-After.
+
+import math
+import threading
+import time
+
+from flask import current_app, g, request
+from flask_smorest import abort
+
+from .db import db
+
+# HTTP metody, které mění data - mají vlastní prioritu
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def exempt(view):
+    """
+    Dekorátor pro endpointy, na které se řízení přístupu nevztahuje
+    (např. endpoint s metrikami - musí odpovídat i při přetížení).
+    """
+    view.admission_exempt = True
+    return view
+
+
+class AdaptiveLimit:
+    """
+    Adaptivní limit souběžnosti založený na gradientu latence.
+
+    Porovnává krátkodobý průměr latence s dlouhodobým (výchozí stav bez zátěže).
+    Roste-li latence, limit se sníží úměrně poměru latencí; je-li latence stabilní,
+    limit pomalu roste (o odmocninu z limitu). Plné zaplnění DB poolu znamená,
+    že požadavky čekají na spojení - limit se pak sníží vždy.
+    """
+
+    def __init__(self, initial, min_limit, max_limit, tolerance=1.5, smoothing=0.2):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance  # Kolikrát smí krátkodobá latence převýšit dlouhodobou
+        self.smoothing = smoothing
+        self.short_latency = None  # Exponenciální klouzavý průměr - rychlý
+        self.long_latency = None  # Exponenciální klouzavý průměr - pomalý
+
+    def update(self, latency, in_flight, pool_saturation):
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+        else:
+            self.short_latency = 0.5 * self.short_latency + 0.5 * latency
+            self.long_latency = 0.99 * self.long_latency + 0.01 * latency
+            # Po odeznění zátěže se dlouhodobý průměr rychle vrací dolů
+            if self.short_latency < self.long_latency:
+                self.long_latency = 0.9 * self.long_latency + 0.1 * self.short_latency
+
+        if self.short_latency > 0:
+            ratio = self.tolerance * self.long_latency / self.short_latency
+            gradient = max(0.5, min(1.0, ratio))
+        else:
+            gradient = 1.0
+        if pool_saturation >= 1.0:
+            gradient = min(gradient, 0.9)
+
+        # Rezerva pro růst; pokud limit není ani z poloviny využit, neroste
+        headroom = math.sqrt(self.limit) if in_flight * 2 >= self.limit else 0.0
+        new_limit = self.limit * gradient + headroom
+        new_limit = (1 - self.smoothing) * self.limit + self.smoothing * new_limit
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+
+class AdmissionController:
+    """
+    Rozšíření Flasku, které hlídá souběžnost požadavků na API blueprintech.
+    Čtení a zápisy mají samostatné priority - každá smí využít jen svůj podíl
+    z aktuálního limitu (ADMISSION_PRIORITIES), takže při přetížení se nejdřív
+    odmítají méně důležité požadavky.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Nastavení ADMISSION_* je v config.py
+        priorities = app.config["ADMISSION_PRIORITIES"]
+        # Stav se drží zvlášť pro každou aplikaci (a tedy i každý proces serveru)
+        app.extensions["admission"] = {
+            "limiter": AdaptiveLimit(
+                app.config["ADMISSION_INITIAL_LIMIT"],
+                app.config["ADMISSION_MIN_LIMIT"],
+                app.config["ADMISSION_MAX_LIMIT"],
+            ),
+            "in_flight": dict.fromkeys(priorities, 0),
+            "admitted": dict.fromkeys(priorities, 0),
+            "shed": dict.fromkeys(priorities, 0),
+        }
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    # --- Pomocné metody ---
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["admission"]
+
+    @staticmethod
+    def _is_exempt():
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None:
+            return True
+        view_class = getattr(view, "view_class", None)
+        return getattr(view, "admission_exempt", False) or getattr(
+            view_class, "admission_exempt", False
+        )
+
+    @staticmethod
+    def pool_saturation():
+        """
+        Zaplnění poolu DB spojení (0.0 - 1.0). Hodnota 1.0 znamená, že všechna spojení
+        jsou vypůjčená a další požadavky na spojení čekají.
+        Pooly bez pevné kapacity (např. SQLite in-memory) vrací 0.0.
+        """
+        pool = db.engine.pool
+        if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+            return 0.0
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        if max_overflow < 0:  # Neomezený overflow - na spojení se nikdy nečeká
+            return 0.0
+        capacity = pool.size() + max_overflow
+        if capacity <= 0:
+            return 0.0
+        return min(1.0, pool.checkedout() / capacity)
+
+    # --- Hooky požadavku ---
+
+    def _before_request(self):
+        config = current_app.config
+        if not config["ADMISSION_ENABLED"]:
+            return None
+        if request.blueprint not in config["ADMISSION_BLUEPRINTS"]:
+            return None
+        if self._is_exempt():
+            return None
+
+        priority = "write" if request.method in WRITE_METHODS else "read"
+        state = self._state()
+        with self._lock:
+            limit = state["limiter"].limit * config["ADMISSION_PRIORITIES"][priority]
+            in_flight = sum(state["in_flight"].values())
+            if in_flight >= max(1, limit):
+                state["shed"][priority] += 1
+                rejected = True
+            else:
+                state["in_flight"][priority] += 1
+                state["admitted"][priority] += 1
+                rejected = False
+
+        if rejected:
+            # Rychlé odmítnutí - klient to má zkusit znovu za chvíli
+            abort(
+                503,
+                message="Služba je dočasně přetížená, zkuste to prosím znovu.",
+                headers={"Retry-After": str(config["ADMISSION_RETRY_AFTER"])},
+            )
+
+        g.admission = (priority, time.monotonic())
+        return None
+
+    def _teardown_request(self, exc):
+        admitted = g.pop("admission", None)
+        if admitted is None:
+            return
+        priority, started = admitted
+        latency = time.monotonic() - started
+        saturation = self.pool_saturation()
+
+        state = self._state()
+        with self._lock:
+            in_flight = sum(state["in_flight"].values())
+            state["in_flight"][priority] -= 1
+            state["limiter"].update(latency, in_flight, saturation)
+
+    # --- Metriky ---
+
+    def metrics(self):
+        """Vrátí aktuální stav řízení přístupu (limit, rozpracované a odmítnuté požadavky)."""
+        state = self._state()
+        with self._lock:
+            limiter = state["limiter"]
+            return {
+                "enabled": current_app.config["ADMISSION_ENABLED"],
+                "limit": round(limiter.limit, 2),
+                "latency_short": limiter.short_latency,
+                "latency_long": limiter.long_latency,
+                "pool_saturation": self.pool_saturation(),
+                "in_flight": dict(state["in_flight"]),
+                "admitted": dict(state["admitted"]),
+                "shed": dict(state["shed"]),
+            }
+
+
+admission = AdmissionController()
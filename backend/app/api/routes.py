@@ -9,8 +9,24 @@ from flask_smorest import abort  # Funkce pro HTTP chyby a Blueprint z Flask-Smo
 # Zde předpokládáme, že api_v1_bp je instance Blueprint definovaná v api/__init__.py
 
 # Importy z vaší aplikace
-from ..models import User  # Import databázového modelu User
-from ..schemas import UserSchema, UserCreateSchema  # Import Marshmallow schémat
+from ..models import User, ImportJob, ImportJobError  # Import databázových modelů
+from ..schemas import (  # Import Marshmallow schémat
+    UserSchema,
+    UserCreateSchema,
+    UserListArgsSchema,
+    UserStatsArgsSchema,
+    UserSignupBucketSchema,
+    ImportJobSchema,
+    ImportJobUploadSchema,
+    ImportJobErrorSchema,
+    AdmissionMetricsSchema,
+)
+from .. import imports  # Hromadný import uživatelů na pozadí
+from ..counters import count_rows, adjust_counter  # Levné zjištění celkového počtu
+from ..stats import record_signups, query_rollups  # Předpočítané statistiky registrací
+from ..singleflight import coalesce, singleflight  # Slučování souběžných GET požadavků
+from ..admission import admission, exempt  # Řízení přístupu (load shedding)
+from ..sharding import shards  # Směrování uživatelů do shardů (volitelné)
 from ..db import db  # Import instance SQLAlchemy databáze
 from sqlalchemy.exc import IntegrityError  # Pro odchytávání chyb unikátnosti
 from . import api_v1_bp
@@ -29,19 +45,34 @@ class UsersResource(MethodView):
     Zpracovává GET (seznam) a POST (vytvoření).
     """
 
+    @coalesce
+    # Souběžné identické požadavky sdílí jeden dotaz a jedno serializované tělo.
+    # Musí být nad @response, aby se sdílela už hotová odpověď.
+    @api_v1_bp.arguments(UserListArgsSchema, location="query")
+    # location="query": argumenty se čtou z query stringu (?count=estimated)
     @api_v1_bp.response(200, UserSchema(many=True))
     # Dekorátor definuje úspěšnou odpověď (HTTP 200 OK).
     # - UserSchema(many=True): Určuje, že odpověď bude seznam objektů,
     #   které budou serializovány pomocí UserSchema.
     # - Automaticky generuje dokumentaci pro OpenAPI (Swagger).
-    def get(self):
-        """Získat seznam všech uživatelů."""
+    def get(self, args):
+        """
+        Získat seznam všech uživatelů.
+        S parametrem `count` (exact/estimated/counter) vrací celkový počet
+        uživatelů v hlavičce X-Total-Count.
+        """
         # Použití moderního stylu SQLAlchemy 2.0 pro dotazování
         stmt = db.select(User).order_by(User.username)
-        # scalars() vrátí jednotlivé hodnoty (objekty User), all() je načte
-        users = db.session.scalars(stmt).all()
-        # Flask-Smorest se postará o serializaci pomocí UserSchema(many=True)
-        return users
+        # Dotaz se spustí na všech shardech (bez shardingu jen nad výchozí DB)
+        # a výsledky se seřadí podle username
+        users = shards.scatter_gather(stmt, key=lambda user: user.username)
+
+        if args["count"] is None:
+            # Flask-Smorest se postará o serializaci pomocí UserSchema(many=True)
+            return users
+        # Vrácení dvojice (data, hlavičky) - Flask-Smorest hlavičky přidá do odpovědi
+        total = count_rows(User, args["count"], shards.sessions())
+        return users, {"X-Total-Count": str(total)}
 
     @api_v1_bp.arguments(UserCreateSchema)
     # Dekorátor definuje očekávaná vstupní data v těle požadavku.
@@ -57,10 +88,8 @@ class UsersResource(MethodView):
         Očekává data podle UserCreateSchema v těle POST požadavku.
         """
         # Kontrola, zda uživatel s daným emailem nebo username již neexistuje
-        if User.query.filter(
-            (User.username == new_user_data["username"])
-            | (User.email == new_user_data["email"])
-        ).first():
+        # (se shardingem globálně přes vyhledávací tabulku user_directory)
+        if shards.identity_taken(new_user_data["username"], new_user_data["email"]):
             abort(
                 409, message="Uživatel s tímto jménem nebo emailem již existuje."
             )  # Conflict
@@ -73,10 +102,16 @@ class UsersResource(MethodView):
         # user.set_password(new_user_data['password']) # Předpokládá metodu v modelu User
 
         try:
-            db.session.add(user)
-            db.session.commit()
+            # Vložení a odeslání INSERTu - databáze doplní id a created_at
+            # (se shardingem se ID přidělí v user_directory a uživatel se uloží do shardu)
+            shards.add_user(user)
+            # Udržované počítadlo a statistiky registrací se mění ve stejné transakci
+            # (pořadí zámků uživatelé -> počítadlo -> statistiky je u všech zápisů stejné)
+            adjust_counter(User, 1)
+            record_signups([user.created_at])
+            shards.commit()
         except IntegrityError as e:  # Specifická chyba pro porušení unikátnosti
-            db.session.rollback()
+            shards.rollback()
             # Logování chyby by bylo vhodné
             # print(f"IntegrityError: {e}")
             abort(
@@ -84,14 +119,32 @@ class UsersResource(MethodView):
                 message=f"Chyba při ukládání: Uživatel s těmito údaji již pravděpodobně existuje.",
             )
         except Exception as e:  # Obecná chyba pro jiné problémy
-            db.session.rollback()
+            shards.rollback()
             # Logování chyby
             # print(f"Exception: {e}")
             abort(500, message="Interní chyba serveru při ukládání uživatele.")
+        # Rozpracované čtení seznamu a statistik už může obsahovat stará data -
+        # nové požadavky se k nim nepřipojí a načtou data znovu
+        singleflight.forget("/api/v1/users")
         # Vrácení nově vytvořeného uživatele (serializace proběhne automaticky)
         return user
 
 
+@api_v1_bp.route("/users/stats")
+class UserStatsResource(MethodView):
+    """
+    Resource se statistikami registrací uživatelů (/users/stats).
+    Čte předpočítané rollupy, cena dotazu tedy nezávisí na počtu uživatelů.
+    """
+
+    @coalesce
+    @api_v1_bp.arguments(UserStatsArgsSchema, location="query")
+    @api_v1_bp.response(200, UserSignupBucketSchema(many=True))
+    def get(self, args):
+        """Získat počty registrací po dnech, týdnech nebo měsících."""
+        return query_rollups(args["period"], args["start"], args["end"])
+
+
 @api_v1_bp.route("/users/<int:user_id>")  # Cesta s parametrem user_id
 class UserResource(MethodView):
     """
@@ -99,12 +152,14 @@ class UserResource(MethodView):
     Zpracovává GET (detail), PUT (aktualizace), DELETE (smazání).
     """
 
+    @coalesce
     @api_v1_bp.response(200, UserSchema)
     # Odpověď pro úspěšné nalezení (HTTP 200 OK), serializovaná UserSchema.
     def get(self, user_id):
         """Získat detail uživatele podle ID."""
         # Použití metody get_or_404 pro snadné získání záznamu nebo vrácení 404 Not Found
-        user = db.session.get(User, user_id)  # Moderní způsob získání podle PK
+        # Moderní způsob získání podle PK - v session shardu, kam uživatel patří
+        user = shards.session_for(user_id).get(User, user_id)
         if user is None:
             abort(404, message="Uživatel nebyl nalezen.")
         # Alternativa: user = User.query.get_or_404(user_id, description="Uživatel nebyl nalezen.")
@@ -119,7 +174,7 @@ class UserResource(MethodView):
         Aktualizovat existujícího uživatele (celý záznam).
         Očekává data podle UserSchema v těle PUT požadavku.
         """
-        user = db.session.get(User, user_id)
+        user = shards.session_for(user_id).get(User, user_id)
         if user is None:
             abort(404, message="Uživatel nebyl nalezen.")
 
@@ -136,30 +191,145 @@ class UserResource(MethodView):
         #    user.set_password(update_data['password']) # Opět, nutné hashování
 
         try:
-            db.session.commit()
+            # Se shardingem se username/email změní i v user_directory (unikátnost)
+            shards.update_directory(user)
+            shards.commit()
         except Exception as e:
-            db.session.rollback()
+            shards.rollback()
             abort(500, message="Interní chyba serveru při aktualizaci uživatele.")
+        singleflight.forget("/api/v1/users")
         return user
 
     @api_v1_bp.response(204)  # Odpověď HTTP 204 No Content pro úspěšné smazání
     def delete(self, user_id):
         """Smazat uživatele podle ID."""
-        user = db.session.get(User, user_id)
+        user = shards.session_for(user_id).get(User, user_id)
         if user is None:
             abort(404, message="Uživatel nebyl nalezen.")
 
+        created_at = user.created_at  # Po smazání už objekt nelze načíst
         try:
-            db.session.delete(user)
-            db.session.commit()
+            # Pořadí zámků je u všech zápisů stejné: uživatelé -> počítadlo -> statistiky
+            # (jako při vytvoření a importu), jinak by se souběžné zápisy mohly zablokovat
+            shards.remove_user(user)
+            adjust_counter(User, -1)
+            record_signups([created_at], sign=-1)
+            shards.commit()
         except Exception as e:
-            db.session.rollback()
+            shards.rollback()
             abort(500, message="Interní chyba serveru při mazání uživatele.")
+        singleflight.forget("/api/v1/users")
 
         # Při úspěšném smazání se vrací prázdná odpověď s kódem 204
         return ""
 
 
+# --- Endpointy pro hromadný import uživatelů ---
+
+
+@api_v1_bp.route("/jobs")
+class ImportJobsResource(MethodView):
+    """
+    Resource pro vytváření importních úloh (/jobs).
+    Import velkého množství uživatelů neprobíhá v rámci požadavku,
+    ale na pozadí - klient dostane ID úlohy a průběh sleduje přes GET /jobs/<id>.
+    """
+
+    @api_v1_bp.arguments(ImportJobUploadSchema, location="files")
+    # location="files": soubor se očekává v multipart/form-data těle požadavku
+    @api_v1_bp.response(202, ImportJobSchema)
+    # HTTP 202 Accepted - požadavek byl přijat, zpracování ale ještě neskončilo
+    def post(self, files):
+        """
+        Nahrát CSV nebo NDJSON soubor s uživateli a spustit import.
+        CSV musí mít hlavičku se sloupci `username` a `email`.
+        """
+        upload = files["file"]
+        file_format = imports.detect_format(upload.filename or "")
+        if file_format is None:
+            abort(
+                422,
+                message="Nepodporovaný formát souboru (povoleno: .csv, .ndjson, .jsonl).",
+            )
+
+        job = imports.create_job(upload, file_format)
+        imports.submit_job(job.id)
+        # Import (při IMPORT_EXECUTOR = "sync" už dokončený) mění seznam uživatelů.
+        # Workery v poolu procesů klíče v procesu webového serveru odpojit nemohou.
+        singleflight.forget("/api/v1/users")
+        return job
+
+
+@api_v1_bp.route("/jobs/<int:job_id>")
+class ImportJobResource(MethodView):
+    """Resource pro stav konkrétní importní úlohy (/jobs/<id>)."""
+
+    @api_v1_bp.response(200, ImportJobSchema)
+    def get(self, job_id):
+        """Získat stav, průběh a rychlost importní úlohy."""
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            abort(404, message="Importní úloha nebyla nalezena.")
+        return job
+
+
+@api_v1_bp.route("/jobs/<int:job_id>/errors")
+class ImportJobErrorsResource(MethodView):
+    """Resource pro chyby jednotlivých řádků importu (/jobs/<id>/errors)."""
+
+    @api_v1_bp.response(200, ImportJobErrorSchema(many=True))
+    @api_v1_bp.paginate()
+    # Stránkování - parametry ?page=&page_size=, informace v hlavičce X-Pagination
+    def get(self, job_id, pagination_parameters):
+        """Získat stránkovaný seznam chybných řádků importu."""
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            abort(404, message="Importní úloha nebyla nalezena.")
+        pagination_parameters.item_count = job.failed_rows
+        return (
+            job.errors.order_by(ImportJobError.row_number)
+            .offset(pagination_parameters.first_item)
+            .limit(pagination_parameters.page_size)
+            .all()
+        )
+
+
+@api_v1_bp.route("/jobs/<int:job_id>/resume")
+class ImportJobResumeResource(MethodView):
+    """Resource pro navázání nedokončeného importu (/jobs/<id>/resume)."""
+
+    @api_v1_bp.response(202, ImportJobSchema)
+    def post(self, job_id):
+        """
+        Navázat import po selhání nebo pádu workeru.
+        Zpracování pokračuje od posledního uloženého checkpointu.
+        """
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            abort(404, message="Importní úloha nebyla nalezena.")
+        if not imports.is_resumable(job):
+            abort(409, message="Úloha je dokončená nebo stále běží.")
+
+        imports.submit_job(job.id)
+        singleflight.forget("/api/v1/users")  # Viz ImportJobsResource.post
+        db.session.refresh(job)
+        return job
+
+
+# --- Provozní endpointy ---
+
+
+@api_v1_bp.route("/admission")
+@exempt  # Metriky musí být dostupné i ve chvíli, kdy se ostatní požadavky odmítají
+class AdmissionMetricsResource(MethodView):
+    """Resource s metrikami řízení přístupu (/admission)."""
+
+    @api_v1_bp.response(200, AdmissionMetricsSchema)
+    def get(self):
+        """Získat aktuální limit souběžnosti a počty přijatých/odmítnutých požadavků."""
+        return admission.metrics()
+
+
 # Zde můžete přidat další Resources pro jiné části vašeho API
 # např. Events, Registrations, atd.
 # @api_v1_bp.route("/events")
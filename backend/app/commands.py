@@ -0,0 +1,104 @@
+# Tento soubor definuje vlastní příkazy pro Flask CLI.
+# Registrují se v create_app() pomocí app.cli, spouští se např. `flask import-jobs resume`.
+
+import click
+from flask.cli import AppGroup
+
+from .counters import init_counter
+from .db import db
+from .imports import is_resumable, submit_job
+from .models import ImportJob, User
+from .sharding import shards
+from .stats import rebuild_rollups
+
+import_jobs_cli = AppGroup("import-jobs", help="Správa úloh hromadného importu.")
+counters_cli = AppGroup("counters", help="Správa udržovaných počítadel záznamů.")
+user_stats_cli = AppGroup("user-stats", help="Správa statistik registrací uživatelů.")
+user_shards_cli = AppGroup("user-shards", help="Správa shardů tabulky uživatelů.")
+
+
+@import_jobs_cli.command("resume")
+@click.option("--all", "resume_all", is_flag=True,
+              help="Navázat i úlohy, které ještě nejsou považovány za zaseknuté.")
+def resume_import_jobs(resume_all):
+    """Znovu spustí nedokončené importy (např. po pádu nebo restartu workerů)."""
+    jobs = db.session.scalars(
+        db.select(ImportJob).where(
+            ImportJob.status != ImportJob.STATUS_COMPLETED
+        ).order_by(ImportJob.id)
+    ).all()
+    resumed = 0
+    for job in jobs:
+        if resume_all or is_resumable(job):
+            submit_job(job.id)
+            resumed += 1
+            click.echo(
+                f"Úloha {job.id} znovu spuštěna "
+                f"(zpracováno {job.processed_rows} řádků)."
+            )
+    click.echo(f"Navázáno úloh: {resumed}")
+
+
+@counters_cli.command("init")
+def init_counters():
+    """Založí (nebo přepočítá) počítadlo uživatelů pro `?count=counter`."""
+    value = init_counter(User, shards.sessions())
+    click.echo(f"Počítadlo uživatelů nastaveno na {value}.")
+
+
+@user_stats_cli.command("rebuild")
+def rebuild_user_stats():
+    """Přepočítá statistiky registrací (rollupy) z tabulky uživatelů."""
+    # Nedokončené zápisy na shardy se nejdřív dokončí, aby je přepočet nevynechal
+    shards.reconcile()
+    buckets = rebuild_rollups(shards.sessions())
+    click.echo(f"Statistiky přepočítány, počet období: {buckets}")
+
+
+@user_shards_cli.command("create")
+def create_user_shards():
+    """Vytvoří tabulku uživatelů ve všech shardech z USER_SHARDS."""
+    if not shards.enabled():
+        click.echo("Sharding není zapnutý (USER_SHARDS je prázdné).")
+        return
+    shards.create_all()
+    click.echo("Tabulky na shardech vytvořeny.")
+    remaining = shards.unmigrated_count()
+    if remaining:
+        click.echo(
+            f"Ve výchozí databázi je {remaining} uživatelů, kteří se se shardingem "
+            "nezobrazí - přesuňte je příkazem `flask user-shards migrate`."
+        )
+
+
+@user_shards_cli.command("migrate")
+@click.option("--batch-size", default=1000, show_default=True,
+              help="Počet uživatelů přesunutých v jedné dávce.")
+def migrate_user_shards(batch_size):
+    """Přesune existující uživatele z výchozí databáze do adresáře a shardů."""
+    if not shards.enabled():
+        raise click.ClickException("Sharding není zapnutý (USER_SHARDS je prázdné).")
+    shards.create_all()
+    try:
+        moved = shards.migrate(batch_size=batch_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Přesunuto uživatelů: {moved}")
+
+
+@user_shards_cli.command("reconcile")
+def reconcile_user_shards():
+    """Dokončí zápisy na shardy, které přerušil pád procesu nebo chyba shardu."""
+    if not shards.enabled():
+        click.echo("Sharding není zapnutý (USER_SHARDS je prázdné).")
+        return
+    done = shards.reconcile()
+    click.echo(f"Dokončeno zápisů: {done}")
+
+
+def register_commands(app):
+    """Zaregistruje CLI příkazy aplikace."""
+    app.cli.add_command(import_jobs_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(user_stats_cli)
+    app.cli.add_command(user_shards_cli)
@@ -0,0 +1,183 @@
+# Tento soubor definuje middleware pro kompresi HTTP odpovědí.
+# Klient v hlavičce `Accept-Encoding` oznámí, jaké kódování podporuje,
+# a server vybere nejlepší dostupný algoritmus (gzip, případně brotli/zstd).
+# Velké JSON odpovědi (např. seznam uživatelů) se tak přenáší výrazně menší.
+
+import zlib
+
+from flask import current_app, request
+
+# Volitelné závislosti - brotli a zstd se použijí jen tehdy, pokud jsou nainstalované
+# (`pip install brotli zstandard`). Bez nich funguje komprese pouze přes gzip.
+try:
+    import brotli
+except ImportError:  # pragma: no cover - závisí na prostředí
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - závisí na prostředí
+    zstandard = None
+
+
+# --- Kompresory pro jednotlivé algoritmy ---
+# Všechny mají stejné rozhraní: compress(data, sync) pro další kus dat a flush() na konci.
+# S `sync=True` kompresor vydá vše, co má zatím v interním bufferu (sync flush),
+# takže klient streamované odpovědi dostává data průběžně, ne až na konci.
+# Díky tomu lze stejný kód použít pro běžné i streamované odpovědi.
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        # wbits=31 => formát gzip (hlavička + CRC), nikoli "holý" deflate
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, sync=False):
+        output = self._obj.compress(data)
+        if sync:
+            output += self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return output
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data, sync=False):
+        output = self._obj.process(data)
+        if sync:
+            output += self._obj.flush()
+        return output
+
+    def flush(self):
+        return self._obj.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data, sync=False):
+        output = self._obj.compress(data)
+        if sync:
+            output += self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return output
+
+    def flush(self):
+        return self._obj.flush()
+
+
+def _available_compressors():
+    """Vrátí mapování název kódování -> (třída kompresoru, konfigurační klíč úrovně)."""
+    compressors = {"gzip": (_GzipCompressor, "COMPRESS_LEVEL")}
+    if brotli is not None:
+        compressors["br"] = (_BrotliCompressor, "COMPRESS_BR_LEVEL")
+    if zstandard is not None:
+        compressors["zstd"] = (_ZstdCompressor, "COMPRESS_ZSTD_LEVEL")
+    return compressors
+
+
+class Compress:
+    """
+    Rozšíření Flasku, které komprimuje odpovědi podle hlavičky `Accept-Encoding`.
+    Inicializuje se stejně jako ostatní rozšíření (`compress.init_app(app)`).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Nastavení COMPRESS_* je v config.py
+        app.extensions["compress"] = self
+        app.after_request(self.after_request)
+
+    def _choose_encoding(self, config):
+        """Vybere nejlepší kódování podle `Accept-Encoding` a dostupných algoritmů."""
+        compressors = _available_compressors()
+        offered = [
+            name for name in config["COMPRESS_ALGORITHMS"] if name in compressors
+        ]
+        # best_match respektuje q-hodnoty klienta (včetně q=0 a "*")
+        # a při shodě kvality vybere algoritmus, který je v seznamu serveru dříve.
+        return request.accept_encodings.best_match(offered)
+
+    def _should_compress(self, response, config):
+        if not config["COMPRESS_ENABLED"]:
+            return False
+        # Prázdné nebo speciální odpovědi (204 No Content, 304 Not Modified, ...)
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        # Odpověď už je zakódovaná (např. předkomprimovaný soubor)
+        if "Content-Encoding" in response.headers:
+            return False
+        # Soubory posílané přímo (send_file) necháme beze změny
+        if response.direct_passthrough:
+            return False
+        if response.mimetype not in config["COMPRESS_MIMETYPES"]:
+            return False
+        # U streamované odpovědi velikost předem neznáme, komprimujeme vždy
+        if not response.is_streamed:
+            if response.calculate_content_length() < config["COMPRESS_MIN_SIZE"]:
+                return False
+        return True
+
+    def after_request(self, response):
+        """Zkomprimuje odpověď, pokud to klient podporuje a má to smysl."""
+        config = current_app.config
+
+        # Odpověď se liší podle Accept-Encoding - informujeme proxy/cache
+        if (
+            config["COMPRESS_ENABLED"]
+            and response.mimetype in config["COMPRESS_MIMETYPES"]
+        ):
+            response.vary.add("Accept-Encoding")
+
+        if not self._should_compress(response, config):
+            return response
+
+        encoding = self._choose_encoding(config)
+        if encoding is None:
+            return response
+
+        compressor_cls, level_key = _available_compressors()[encoding]
+        compressor = compressor_cls(config[level_key])
+
+        if response.is_streamed:
+            # Inkrementální komprese - každý kus se zkomprimuje a odešle hned, jak je
+            # vygenerován (sync flush), takže klient dostává data průběžně
+            # a celá odpověď se nemusí držet v paměti.
+            chunks = response.response
+
+            def generate():
+                try:
+                    for chunk in chunks:
+                        if isinstance(chunk, str):
+                            chunk = chunk.encode("utf-8")
+                        if not chunk:
+                            continue  # Prázdný kus by vyprodukoval jen značku flushe
+                        yield compressor.compress(chunk, sync=True)
+                    yield compressor.flush()
+                finally:
+                    close = getattr(chunks, "close", None)
+                    if close is not None:
+                        close()
+
+            response.response = generate()
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            response.set_data(compressor.compress(body) + compressor.flush())
+
+        response.headers["Content-Encoding"] = encoding
+        # Silný ETag už po změně kódování neplatí pro původní bajty
+        if "ETag" in response.headers:
+            etag, weak = response.get_etag()
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compress = Compress()
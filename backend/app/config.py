@@ -21,6 +21,63 @@ class Config:
     OPENAPI_SWAGGER_UI_PATH = "/swagger"
     OPENAPI_SWAGGER_UI_URL = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
 
+    # Komprese odpovědí (viz app/compression.py)
+    # brotli a zstd se nabízí jen pokud jsou nainstalované balíčky `brotli`/`zstandard`
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "1") == "1"
+    # Pořadí určuje preferenci serveru při stejné kvalitě (q) u klienta
+    COMPRESS_ALGORITHMS = ["br", "zstd", "gzip"]
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))  # gzip 1-9
+    COMPRESS_BR_LEVEL = int(os.environ.get("COMPRESS_BR_LEVEL", 4))  # brotli 0-11
+    COMPRESS_ZSTD_LEVEL = int(os.environ.get("COMPRESS_ZSTD_LEVEL", 3))  # zstd 1-22
+    COMPRESS_MIN_SIZE = 500  # Menší odpovědi (v bajtech) se nekomprimují
+    COMPRESS_MIMETYPES = [
+        "application/json",
+        "application/javascript",
+        "text/css",
+        "text/csv",
+        "text/html",
+        "text/plain",
+        "application/x-ndjson",
+    ]
+
+    # Hromadný import uživatelů na pozadí (viz app/imports.py)
+    IMPORT_UPLOAD_FOLDER = os.environ.get("IMPORT_UPLOAD_FOLDER") or os.path.join(
+        basedir, "../instance/imports"
+    )
+    # Maximální velikost těla požadavku (i nahraného souboru) - větší odmítne Flask s 413
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 100 * 1024 * 1024))
+    IMPORT_EXECUTOR = "process"  # "process" = pool procesů, "sync" = v požadavku
+    IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", 2))
+    IMPORT_CHUNK_SIZE = 1000  # Počet řádků v jedné dávce (= jedna transakce)
+    IMPORT_MAX_RETRIES = 3  # Kolikrát se úloha automaticky spustí znovu po pádu workeru
+    IMPORT_STALE_AFTER = 300  # Po kolika s bez aktualizace lze běžící úlohu navázat
+
+    # Řízení přístupu a odmítání zátěže (viz app/admission.py)
+    ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+    ADMISSION_BLUEPRINTS = ["api_v1"]  # Na které blueprinty se řízení vztahuje
+    ADMISSION_INITIAL_LIMIT = 20  # Počáteční limit souběžných požadavků
+    ADMISSION_MIN_LIMIT = 2
+    ADMISSION_MAX_LIMIT = 200
+    # Podíl limitu, který smí využít čtení/zápisy - při přetížení se nejdřív odmítá čtení
+    ADMISSION_PRIORITIES = {"write": 1.0, "read": 0.8}
+    ADMISSION_RETRY_AFTER = 1  # Hodnota hlavičky Retry-After (v sekundách)
+
+    # Celkové počty záznamů v hlavičce X-Total-Count (viz app/counters.py)
+    COUNT_ESTIMATE_TTL = 10  # Jak dlouho (s) se cachuje odhad počtu z pg_class
+
+    # Slučování souběžných identických GET požadavků (viz app/singleflight.py)
+    SINGLEFLIGHT_ENABLED = True
+    # Hlavičky, podle kterých se liší odpověď - požadavky s různými hodnotami se neslučují
+    SINGLEFLIGHT_VARY = ["Accept", "Authorization"]
+
+    # Volitelný sharding tabulky uživatelů (viz app/sharding.py)
+    # Shardy jsou databáze ze SQLALCHEMY_BINDS, např.:
+    # SQLALCHEMY_BINDS = {"users_0": "postgresql+psycopg://.../users_0", "users_1": ...}
+    # USER_SHARDS = ["users_0", "users_1"]
+    USER_SHARDS = []  # Prázdný seznam = sharding vypnutý
+    USER_SHARD_STRATEGY = "hash"  # "hash" nebo "range"
+    USER_SHARD_RANGES = []  # Pro "range": exkluzivní horní meze ID (o jednu méně než shardů)
+
 
 class DevelopmentConfig(Config):
     """Konfigurace pro vývoj."""
@@ -42,6 +99,7 @@ class TestingConfig(Config):
         or "sqlite:///:memory:"
     )
     WTF_CSRF_ENABLED = False  # Vypnutí CSRF pro testy formulářů
+    IMPORT_EXECUTOR = "sync"  # In-memory SQLite není sdílená mezi procesy
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,163 @@
+# Tento soubor poskytuje levné zjištění celkového počtu záznamů v tabulce.
+#
+# `SELECT count(*)` nad velkou tabulkou znamená na PostgreSQL průchod celou tabulkou.
+# Proto nabízíme tři režimy:
+# - "exact":     přesný count(*) - spolehlivý, ale u velkých tabulek pomalý,
+# - "estimated": odhad ze statistik plánovače (pg_class.reltuples), krátce cachovaný,
+# - "counter":   udržované počítadlo v tabulce `table_counters`, které se mění
+#                ve stejné transakci jako vložení/smazání záznamu. Počítadlo se
+#                zakládá explicitně příkazem `flask counters init` (viz init_counter).
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .db import db
+from .models import TableCounter
+
+COUNT_MODES = ("exact", "estimated", "counter")
+
+# Cache odhadů: název tabulky -> (hodnota, čas vypršení). Sdílená v rámci procesu.
+_estimate_cache = {}
+_estimate_lock = threading.Lock()
+
+
+def count_rows(model, mode, sessions=None):
+    """
+    Vrátí počet záznamů tabulky daného modelu zvoleným režimem (viz COUNT_MODES).
+    `sessions` jsou databáze, ve kterých tabulka leží (shardy) - výsledek je součet;
+    výchozí je `db.session`. Počítadlo je vždy ve výchozí databázi.
+    """
+    sessions = sessions or [db.session]
+    if mode == "exact":
+        return _exact_count(model, sessions)
+    if mode == "estimated":
+        return _estimated_count(model, sessions)
+    if mode == "counter":
+        return _counter_value(model, sessions)
+    raise ValueError(f"Neznámý režim počítání: {mode}")
+
+
+def adjust_counter(model, delta):
+    """
+    Změní udržované počítadlo tabulky o `delta` v rámci aktuální transakce.
+    Volá se před commitem až po INSERT/DELETE do počítané tabulky, takže počítadlo
+    se uloží (nebo vrátí při rollbacku) atomicky s daty a zámek z init_counter()
+    na tabulce zároveň brání úpravě počítadla během jeho zakládání.
+    UPDATE ... SET value = value + :delta je atomický i při souběžných zápisech.
+    Pokud počítadlo ještě nebylo založené (init_counter), nic se neděje.
+    """
+    if not delta:
+        return
+    db.session.execute(
+        update(TableCounter)
+        .where(TableCounter.name == model.__tablename__)
+        .values(value=TableCounter.value + delta)
+    )
+
+
+def init_counter(model, sessions=None):
+    """
+    Založí (nebo přepočítá) udržované počítadlo tabulky přesným počtem záznamů.
+    `sessions` jsou databáze s tabulkou (shardy), výchozí je `db.session`.
+
+    Počítaná tabulka se na PostgreSQL zamkne v režimu SHARE: běžící zápisy se
+    nejdřív dokončí a nové INSERT/DELETE počkají, dokud se počítadlo neuloží.
+    Mezi spočítáním a uložením tak nemůže vzniknout zápis, který by počítadlo
+    minul. (SQLite dovolí jen jeden zápis naráz - souběžná transakce, která by
+    počet změnila, skončí chybou "database is locked".)
+    """
+    sessions = sessions or [db.session]
+    for session in sessions:
+        lock_against_writes(model, session)
+    value = _exact_count(model, sessions)
+    _store_counter(model, value)
+    db.session.commit()
+    # Commit na shardech jen uvolní zámky (nic se v nich neměnilo)
+    for session in sessions:
+        if session is not db.session:
+            session.commit()
+    return value
+
+
+def lock_against_writes(model, session):
+    """
+    Zamkne tabulku modelu proti INSERT/UPDATE/DELETE do konce transakce `session`
+    (PostgreSQL, LOCK TABLE ... IN SHARE MODE; čtení zámek nebrzdí). Běžící zápisy
+    se nejdřív dokončí. Používá se při přepočtu odvozených dat z celé tabulky.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text(f"LOCK TABLE {model.__tablename__} IN SHARE MODE"))
+
+
+def _store_counter(model, value):
+    name = model.__tablename__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = (postgresql if dialect == "postgresql" else sqlite).insert
+        stmt = dialect_insert(TableCounter).values(name=name, value=value)
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[TableCounter.name], set_={"value": value}
+            )
+        )
+        return
+    result = db.session.execute(
+        update(TableCounter).where(TableCounter.name == name).values(value=value)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(TableCounter).values(name=name, value=value))
+
+
+def _exact_count(model, sessions):
+    stmt = select(func.count()).select_from(model)
+    return sum(session.scalar(stmt) for session in sessions)
+
+
+def _estimated_count(model, sessions):
+    table = model.__tablename__
+    now = time.monotonic()
+    with _estimate_lock:
+        cached = _estimate_cache.get(table)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    value = sum(_estimate_one(model, session) for session in sessions)
+
+    ttl = current_app.config["COUNT_ESTIMATE_TTL"]
+    with _estimate_lock:
+        _estimate_cache[table] = (value, now + ttl)
+    return value
+
+
+def _estimate_one(model, session):
+    if session.get_bind().dialect.name == "postgresql":
+        # reltuples aktualizuje VACUUM/ANALYZE; -1 znamená "tabulka ještě nebyla analyzována"
+        reltuples = session.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": model.__tablename__},
+        )
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    # Ostatní databáze (SQLite) statistiky nemají - použijeme přesný počet
+    return _exact_count(model, [session])
+
+
+def _counter_value(model, sessions):
+    value = db.session.scalar(
+        select(TableCounter.value).where(TableCounter.name == model.__tablename__)
+    )
+    if value is not None:
+        return value
+    # Počítadlo ještě nebylo založené (`flask counters init`) - vrátíme přesný počet.
+    # Neukládáme ho: bez zámku by mohl minout souběžně potvrzované zápisy.
+    return _exact_count(model, sessions)
+
+
+def clear_estimate_cache():
+    """Vyprázdní cache odhadů (např. v testech)."""
+    with _estimate_lock:
+        _estimate_cache.clear()
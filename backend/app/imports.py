@@ -0,0 +1,372 @@
+# Tento soubor implementuje hromadný import uživatelů na pozadí.
+#
+# Průběh:
+# 1. Klient nahraje CSV nebo NDJSON soubor (POST /api/v1/jobs) a ihned dostane ID úlohy.
+# 2. Úloha se předá do lokálního poolu procesů (ProcessPoolExecutor).
+# 3. Worker čte soubor po dávkách, každý řádek validuje pomocí UserCreateSchema
+#    a platné řádky vkládá hromadně (na PostgreSQL pomocí COPY).
+# 4. Po každé dávce se ve stejné transakci uloží checkpoint (`processed_rows`),
+#    takže po pádu workeru lze import navázat bez duplicit.
+
+import csv
+import datetime
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+import multiprocessing
+
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from .counters import adjust_counter
+from .db import db
+from .models import ImportJob, ImportJobError, User, _as_utc
+from .schemas import UserCreateSchema
+from .sharding import shards
+from .stats import record_signups
+
+# Podporované formáty podle přípony souboru
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+_DUPLICATE_MESSAGE = {"_row": ["Uživatel s tímto jménem nebo emailem již existuje."]}
+
+
+def detect_format(filename):
+    """Vrátí formát souboru podle přípony nebo None, pokud není podporován."""
+    _, ext = os.path.splitext(filename.lower())
+    return FILE_FORMATS.get(ext)
+
+
+def create_job(file_storage, file_format):
+    """
+    Uloží nahraný soubor do IMPORT_UPLOAD_FOLDER a vytvoří pro něj záznam ImportJob.
+    Soubor se ukládá na disk, aby ho mohl číst worker v jiném procesu.
+    """
+    folder = current_app.config["IMPORT_UPLOAD_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    filename = secure_filename(file_storage.filename or "") or "upload"
+    path = os.path.join(folder, f"{uuid.uuid4().hex}_{filename}")
+    file_storage.save(path)
+
+    job = ImportJob(
+        filename=file_storage.filename or filename,
+        file_format=file_format,
+        file_path=path,
+        status=ImportJob.STATUS_QUEUED,
+        updated_at=_now(),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def is_resumable(job):
+    """
+    Zda lze úlohu znovu spustit - selhala, nebo "visí" ve stavu running/queued
+    déle než IMPORT_STALE_AFTER sekund (typicky po pádu workeru).
+    """
+    if job.status == ImportJob.STATUS_FAILED:
+        return True
+    if job.status in (ImportJob.STATUS_RUNNING, ImportJob.STATUS_QUEUED):
+        if job.updated_at is None:
+            return True
+        stale_after = current_app.config["IMPORT_STALE_AFTER"]
+        age = (_now() - _as_utc(job.updated_at)).total_seconds()
+        return age > stale_after
+    return False
+
+
+# --- Spouštění úloh ---
+
+_executor = None
+
+
+def _get_executor(max_workers):
+    """Vrátí (a případně vytvoří) pool procesů sdílený v rámci procesu aplikace."""
+    global _executor
+    if _executor is None:
+        # "spawn" - nový proces nesdílí s rodičem otevřená DB spojení (fork by je zdědil)
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _reset_executor():
+    """Zahodí rozbitý pool (např. po pádu workeru), další submit vytvoří nový."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=False)
+    _executor = None
+
+
+def submit_job(job_id):
+    """
+    Předá úlohu ke zpracování podle IMPORT_EXECUTOR:
+    - "process": lokální pool procesů (výchozí),
+    - "sync": zpracování přímo v aktuálním požadavku (testy, ladění).
+    """
+    config = current_app.config
+    if config["IMPORT_EXECUTOR"] == "sync":
+        process_job(job_id)
+        return
+    _submit_to_pool(
+        config["CONFIG_NAME"],
+        job_id,
+        workers=config["IMPORT_WORKERS"],
+        retries_left=config["IMPORT_MAX_RETRIES"],
+    )
+
+
+def _submit_to_pool(config_name, job_id, workers, retries_left):
+    try:
+        future = _get_executor(workers).submit(_worker_entry, config_name, job_id)
+    except BrokenProcessPool:
+        _reset_executor()
+        future = _get_executor(workers).submit(_worker_entry, config_name, job_id)
+
+    def _on_done(fut):
+        # Pokud worker spadl (BrokenProcessPool), pool se obnoví a úloha se spustí znovu.
+        # Díky checkpointu pokračuje od poslední uložené dávky.
+        if isinstance(fut.exception(), BrokenProcessPool) and retries_left > 0:
+            _reset_executor()
+            _submit_to_pool(config_name, job_id, workers, retries_left - 1)
+
+    future.add_done_callback(_on_done)
+
+
+# Aplikace vytvořená v procesu workeru (jedna na proces, znovupoužívá se)
+_worker_app = None
+
+
+def _worker_entry(config_name, job_id):
+    """Vstupní bod v procesu workeru - vytvoří aplikaci a zpracuje úlohu."""
+    global _worker_app
+    if _worker_app is None:
+        from . import create_app  # Import zde kvůli cyklickým importům
+
+        _worker_app = create_app(config_name)
+    with _worker_app.app_context():
+        process_job(job_id)
+
+
+# --- Zpracování úlohy ---
+
+
+def process_job(job_id):
+    """
+    Zpracuje (nebo naváže) import. Čte soubor od řádku `processed_rows`,
+    po dávkách validuje a ukládá uživatele a průběžně aktualizuje stav úlohy.
+    """
+    job = db.session.get(ImportJob, job_id)
+    if job is None or job.status == ImportJob.STATUS_COMPLETED:
+        return
+
+    # Dávka potvrzená v adresáři, kterou pád workeru nestihl zapsat na shardy,
+    # se dokončí teď - checkpoint je už za ní, znovu se zpracovávat nebude
+    shards.reconcile()
+
+    job.status = ImportJob.STATUS_RUNNING
+    job.attempts += 1
+    job.error_message = None
+    job.started_at = job.started_at or _now()
+    job.updated_at = _now()
+    db.session.commit()
+
+    try:
+        if job.total_rows is None:
+            job.total_rows = sum(1 for _ in _read_rows(job))
+            db.session.commit()
+
+        chunk_size = current_app.config["IMPORT_CHUNK_SIZE"]
+        rows = islice(_read_rows(job), job.processed_rows, None)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _process_chunk(job, chunk)
+
+        job.status = ImportJob.STATUS_COMPLETED
+        job.finished_at = _now()
+        job.updated_at = job.finished_at
+        db.session.commit()
+        _remove_file(job)
+    except Exception as e:
+        shards.rollback()
+        job = db.session.get(ImportJob, job_id)
+        job.status = ImportJob.STATUS_FAILED
+        job.error_message = str(e)
+        job.updated_at = _now()
+        db.session.commit()
+        current_app.logger.exception("Import úlohy %s selhal", job_id)
+
+
+def _remove_file(job):
+    """
+    Smaže nahraný soubor dokončené úlohy - už ho nebude potřeba.
+    Soubor neúspěšné úlohy zůstává, aby šlo import navázat.
+    """
+    try:
+        os.remove(job.file_path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        current_app.logger.warning("Soubor importu %s nelze smazat", job.file_path)
+
+
+def _read_rows(job):
+    """
+    Generátor trojic (číslo řádku, data řádku nebo None, původní text).
+    Data jsou None, pokud řádek nejde ani rozparsovat (neplatný JSON apod.).
+    """
+    with open(job.file_path, encoding="utf-8-sig", newline="") as f:
+        if job.file_format == "csv":
+            reader = csv.DictReader(f)
+            for number, row in enumerate(reader, start=1):
+                yield number, row, json.dumps(row, ensure_ascii=False)
+        else:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue  # Prázdné řádky (např. na konci souboru) nejsou data
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    data = None
+                if not isinstance(data, dict):
+                    data = None
+                yield number, data, line
+
+
+def _process_chunk(job, chunk):
+    """Zvaliduje a uloží jednu dávku řádků a posune checkpoint - vše v jedné transakci."""
+    schema = UserCreateSchema()
+    valid = []
+    errors = []
+
+    for number, data, raw in chunk:
+        if data is None:
+            errors.append((number, {"_row": ["Řádek nelze načíst."]}, raw))
+            continue
+        # Neznámá pole (např. další sloupce v CSV) ignorujeme
+        data = {k: v for k, v in data.items() if k in schema.fields}
+        try:
+            valid.append((number, schema.load(data), raw))
+        except ValidationError as err:
+            errors.append((number, err.messages, raw))
+
+    valid, duplicates = _filter_duplicates(valid)
+    errors.extend(duplicates)
+
+    # Čas vytvoření nastavíme sami (COPY nevrací hodnoty doplněné databází),
+    # aby šlo v téže transakci aktualizovat statistiky registrací
+    created_at = _now()
+    for _, row, _ in valid:
+        row["created_at"] = created_at
+
+    try:
+        _insert_users([row for _, row, _ in valid])
+        inserted = len(valid)
+    except IntegrityError:
+        # Souběžný zápis (např. přes POST /users) mezitím vytvořil stejného uživatele.
+        # Dávku zopakujeme po jednotlivých řádcích, aby se zbytek neztratil.
+        shards.rollback()
+        inserted = 0
+        for number, row, raw in valid:
+            try:
+                with db.session.begin_nested():
+                    _insert_users([row])
+                inserted += 1
+            except IntegrityError:
+                errors.append((number, _DUPLICATE_MESSAGE, raw))
+
+    db.session.add_all(
+        ImportJobError(job_id=job.id, row_number=number, messages=messages, raw=raw)
+        for number, messages, raw in errors
+    )
+    # Počítadlo uživatelů a statistiky se posunou ve stejné transakci jako vložení dávky
+    adjust_counter(User, inserted)
+    record_signups([created_at] * inserted)
+    job.processed_rows += len(chunk)
+    job.inserted_rows += inserted
+    job.failed_rows += len(errors)
+    job.updated_at = _now()
+    # Se shardingem se nejdřív potvrdí adresář s checkpointem, pak shardy
+    shards.commit()
+
+
+def _filter_duplicates(rows):
+    """
+    Odfiltruje řádky, jejichž username/email už existuje v DB nebo se opakuje v dávce.
+    Existující hodnoty se zjistí jedním dotazem pro celou dávku.
+    """
+    if not rows:
+        return [], []
+    usernames = {row["username"] for _, row, _ in rows}
+    emails = {row["email"] for _, row, _ in rows}
+    # Se shardingem se kontroluje globální vyhledávací tabulka user_directory
+    existing = shards.existing_identities(usernames, emails)
+    seen_usernames = {username for username, _ in existing}
+    seen_emails = {email for _, email in existing}
+
+    unique, duplicates = [], []
+    for number, row, raw in rows:
+        if row["username"] in seen_usernames or row["email"] in seen_emails:
+            duplicates.append((number, _DUPLICATE_MESSAGE, raw))
+            continue
+        seen_usernames.add(row["username"])
+        seen_emails.add(row["email"])
+        unique.append((number, row, raw))
+    return unique, duplicates
+
+
+def _insert_users(rows):
+    """
+    Vloží uživatele - bez shardingu do výchozí databáze, se shardingem se jim
+    nejdřív přidělí ID v user_directory a každá skupina se vloží do svého shardu.
+    """
+    if not rows:
+        return
+    for session, shard_rows in shards.allocate(rows):
+        _bulk_insert(session, shard_rows)
+
+
+def _bulk_insert(session, rows):
+    """
+    Hromadně vloží uživatele v rámci aktuální transakce dané session.
+    Na PostgreSQL (psycopg 3) použije COPY, jinak INSERT s více řádky.
+    """
+    connection = session.connection()
+    dialect = connection.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg":
+        import psycopg  # Jen pro tuto větev - jiné ovladače psycopg nepotřebují
+
+        columns = list(rows[0])  # username, email, created_at (+ id se shardingem)
+        statement = f"COPY {User.__tablename__} ({', '.join(columns)}) FROM STDIN"
+        raw_connection = connection.connection.driver_connection
+        try:
+            with raw_connection.cursor() as cursor:
+                with cursor.copy(statement) as copy:
+                    for row in rows:
+                        copy.write_row(tuple(row[column] for column in columns))
+        except psycopg.IntegrityError as e:
+            # COPY jde mimo SQLAlchemy, chybu ovladače proto převedeme sami -
+            # volající pak na duplicitu reaguje stejně jako u INSERTu
+            raise IntegrityError(statement, None, e) from e
+    else:
+        # SQLAlchemy 2.0 posílá seznam řádků jako dávkový INSERT (insertmanyvalues)
+        session.execute(insert(User), rows)
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
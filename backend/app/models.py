@@ -45,11 +45,172 @@ class User(db.Model):
     #     """Kontroluje, zda zadané heslo odpovídá uloženému hashi."""
     #     return check_password_hash(self.password_hash, password)
 
+    # eager_defaults=True: hodnoty generované databází (created_at) se načtou hned
+    # při vložení (INSERT ... RETURNING), bez dalšího SELECTu. Potřebují je statistiky
+    # registrací (app/stats.py), které se aktualizují ve stejné transakci.
+    __mapper_args__ = {"eager_defaults": True}
+
     # Metoda pro reprezentaci objektu jako řetězce (užitečné pro ladění)
     def __repr__(self):
         return f"<User {self.username}>"
 
 
+class UserDirectory(db.Model):
+    """
+    Vyhledávací tabulka uživatelů pro sharding (viz app/sharding.py).
+    Leží ve výchozí databázi, přiděluje globálně unikátní ID a hlídá unikátnost
+    username/email napříč všemi shardy. Používá se jen při zapnutém shardingu.
+    Je zdrojem pravdy - obsahuje všechny sloupce uživatele, takže řádek na shardu
+    lze z adresáře kdykoli znovu zapsat.
+    """
+    __tablename__ = "user_directory"
+
+    # Zápis na shard, který ještě nebyl potvrzen (viz UserShards.reconcile)
+    PENDING_UPSERT = "upsert"
+    PENDING_DELETE = "delete"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True))
+    # None = shard odpovídá adresáři, jinak nedokončený zápis (PENDING_*)
+    pending = db.Column(db.String(10), index=True)
+
+    def __repr__(self):
+        return f"<UserDirectory {self.id} {self.username}>"
+
+
+class TableCounter(db.Model):
+    """
+    Udržované počítadlo záznamů v tabulce (viz app/counters.py).
+    Mění se ve stejné transakci jako vkládání/mazání záznamů, takže zjištění
+    celkového počtu je jen čtení jednoho řádku místo `SELECT count(*)`.
+    """
+    __tablename__ = "table_counters"
+
+    # Název počítané tabulky (např. "users")
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TableCounter {self.name}={self.value}>"
+
+
+class UserSignupRollup(db.Model):
+    """
+    Předpočítaný počet registrací uživatelů za období (den, týden, měsíc).
+    Aktualizuje se při vytvoření/smazání uživatele (viz app/stats.py),
+    takže dotaz na statistiky čte jen pár řádků místo všech uživatelů.
+    """
+    __tablename__ = "user_signup_rollups"
+
+    # Typ období: 'day', 'week' nebo 'month'
+    period = db.Column(db.String(5), primary_key=True)
+    # Začátek období (UTC) - den, pondělí daného týdne, resp. první den měsíce
+    bucket = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserSignupRollup {self.period} {self.bucket}={self.count}>"
+
+
+# Modely pro hromadný import uživatelů (viz app/imports.py)
+
+
+class ImportJob(db.Model):
+    """
+    Model reprezentující úlohu hromadného importu uživatelů ze souboru (CSV nebo NDJSON).
+    Úlohu zpracovává worker na pozadí po dávkách (chunks).
+    """
+    __tablename__ = "import_jobs"
+
+    # Možné stavy úlohy
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_QUEUED)
+
+    # Původní název nahraného souboru, jeho formát a cesta k uložené kopii
+    filename = db.Column(db.String(255), nullable=False)
+    file_format = db.Column(db.String(10), nullable=False)  # 'csv' nebo 'ndjson'
+    file_path = db.Column(db.String(500), nullable=False)
+
+    # Počítadla průběhu. `processed_rows` slouží zároveň jako checkpoint -
+    # ukládá se ve stejné transakci jako vložení dávky, takže po pádu workeru
+    # lze import bezpečně navázat od prvního nezpracovaného řádku.
+    total_rows = db.Column(db.Integer)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    inserted_rows = db.Column(db.Integer, nullable=False, default=0)
+    failed_rows = db.Column(db.Integer, nullable=False, default=0)
+
+    # Počet pokusů o zpracování (zvyšuje se při každém (re)startu úlohy)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error_message = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime(timezone=True),
+                           server_default=func.now())
+    started_at = db.Column(db.DateTime(timezone=True))
+    finished_at = db.Column(db.DateTime(timezone=True))
+    # Čas poslední aktualizace - podle něj se poznají "zaseknuté" úlohy po pádu workeru
+    updated_at = db.Column(db.DateTime(timezone=True))
+
+    # Chyby jednotlivých řádků (lazy='dynamic' => dotaz, ne načtení všech chyb najednou)
+    errors = db.relationship(
+        "ImportJobError", backref="job", lazy="dynamic", cascade="all, delete-orphan"
+    )
+
+    @property
+    def progress(self):
+        """Průběh v procentech (None, dokud není znám celkový počet řádků)."""
+        if not self.total_rows:
+            return 100.0 if self.status == self.STATUS_COMPLETED else None
+        return round(100.0 * self.processed_rows / self.total_rows, 2)
+
+    @property
+    def throughput(self):
+        """Průměrná rychlost zpracování v řádcích za sekundu."""
+        if self.started_at is None:
+            return None
+        end = self.finished_at or self.updated_at
+        if end is None:
+            return None
+        elapsed = (_as_utc(end) - _as_utc(self.started_at)).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(self.processed_rows / elapsed, 2)
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.status}>"
+
+
+class ImportJobError(db.Model):
+    """Chyba validace nebo uložení jednoho řádku importovaného souboru."""
+    __tablename__ = "import_job_errors"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey("import_jobs.id"),
+                       nullable=False, index=True)
+    # Číslo datového řádku v souboru (od 1, bez hlavičky CSV)
+    row_number = db.Column(db.Integer, nullable=False)
+    # Chybové zprávy ve formátu Marshmallow ({"pole": ["zpráva", ...]})
+    messages = db.Column(db.JSON, nullable=False)
+    # Původní obsah řádku (pro snadnější opravu dat)
+    raw = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<ImportJobError job={self.job_id} row={self.row_number}>"
+
+
+def _as_utc(value):
+    """SQLite vrací datetime bez časové zóny - doplníme UTC, aby šlo počítat rozdíly."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
 # Zde můžete přidat další modely podle potřeb vaší aplikace
 # Například pro závody (Events), registrace (Registrations), výsledky (Results), atd.
 
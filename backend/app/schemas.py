@@ -9,6 +9,7 @@
 # a formátování odpovědí (@response).
 
 from marshmallow import Schema, fields, validate
+from flask_smorest.fields import Upload
 
 # --- Schémata pro model User ---
 
@@ -52,6 +53,91 @@ class UserCreateSchema(Schema):
     # password = fields.Str(required=True, load_only=True, validate=validate.Length(min=8)) # Příklad s validací délky hesla
 
 
+class UserListArgsSchema(Schema):
+    """
+    Schéma pro query parametry seznamu uživatelů (GET /users?count=...).
+    Parametr `count` určuje, zda a jak se spočítá celkový počet do hlavičky X-Total-Count:
+    - exact: přesný počet (count(*)),
+    - estimated: rychlý odhad ze statistik databáze (krátce cachovaný),
+    - counter: udržované počítadlo aktualizované při vytváření/mazání uživatelů
+      (zakládá se příkazem `flask counters init`, do té doby přesný počet).
+    """
+    count = fields.Str(
+        validate=validate.OneOf(["exact", "estimated", "counter"]),
+        load_default=None,
+    )
+
+
+class UserStatsArgsSchema(Schema):
+    """Schéma pro query parametry statistik registrací (GET /users/stats)."""
+    period = fields.Str(
+        validate=validate.OneOf(["day", "week", "month"]), load_default="day"
+    )
+    start = fields.Date(load_default=None)  # Včetně období, do kterého datum spadá
+    end = fields.Date(load_default=None)
+
+
+class UserSignupBucketSchema(Schema):
+    """Schéma pro počet registrací v jednom období (dni, týdnu, měsíci)."""
+    period = fields.Str(dump_only=True)
+    bucket = fields.Date(dump_only=True)  # Začátek období
+    count = fields.Int(dump_only=True)
+
+
+# --- Schémata pro hromadný import uživatelů ---
+
+
+class ImportJobUploadSchema(Schema):
+    """
+    Schéma pro nahrání souboru s uživateli (multipart/form-data).
+    Formát se určí podle přípony souboru (.csv, .ndjson, .jsonl).
+    """
+    file = Upload(required=True)
+
+
+class ImportJobSchema(Schema):
+    """Schéma pro stav importní úlohy (průběh, rychlost, počty chyb)."""
+    id = fields.Int(dump_only=True)
+    status = fields.Str(dump_only=True)
+    filename = fields.Str(dump_only=True)
+    file_format = fields.Str(dump_only=True)
+    total_rows = fields.Int(dump_only=True, allow_none=True)
+    processed_rows = fields.Int(dump_only=True)
+    inserted_rows = fields.Int(dump_only=True)
+    failed_rows = fields.Int(dump_only=True)
+    attempts = fields.Int(dump_only=True)
+    # Průběh v procentech a rychlost v řádcích za sekundu (vypočtené vlastnosti modelu)
+    progress = fields.Float(dump_only=True, allow_none=True)
+    throughput = fields.Float(dump_only=True, allow_none=True)
+    error_message = fields.Str(dump_only=True, allow_none=True)
+    created_at = fields.DateTime(dump_only=True)
+    started_at = fields.DateTime(dump_only=True, allow_none=True)
+    finished_at = fields.DateTime(dump_only=True, allow_none=True)
+
+
+class ImportJobErrorSchema(Schema):
+    """Schéma pro chybu jednoho řádku importovaného souboru."""
+    row_number = fields.Int(dump_only=True)
+    messages = fields.Dict(dump_only=True)
+    raw = fields.Str(dump_only=True, allow_none=True)
+
+
+# --- Schémata pro provozní metriky ---
+
+
+class AdmissionMetricsSchema(Schema):
+    """Schéma pro metriky řízení přístupu (kolik požadavků bylo přijato a odmítnuto)."""
+    enabled = fields.Bool(dump_only=True)
+    limit = fields.Float(dump_only=True)  # Aktuální adaptivní limit souběžnosti
+    latency_short = fields.Float(dump_only=True, allow_none=True)  # Krátkodobý průměr (s)
+    latency_long = fields.Float(dump_only=True, allow_none=True)  # Dlouhodobý průměr (s)
+    pool_saturation = fields.Float(dump_only=True)  # Zaplnění poolu DB spojení (0-1)
+    # Slovníky podle priority ({"read": ..., "write": ...})
+    in_flight = fields.Dict(keys=fields.Str(), values=fields.Int(), dump_only=True)
+    admitted = fields.Dict(keys=fields.Str(), values=fields.Int(), dump_only=True)
+    shed = fields.Dict(keys=fields.Str(), values=fields.Int(), dump_only=True)
+
+
 # --- Schémata pro další modely ---
 # Zde přidejte schémata pro vaše další modely (Event, Registration, atd.)
 
@@ -0,0 +1,449 @@
+# Tento soubor implementuje volitelné horizontální rozdělení (sharding) tabulky uživatelů
+# do více databází.
+#
+# - Jednotlivé shardy jsou databáze definované v SQLALCHEMY_BINDS, jejich klíče
+#   (v pořadí) určuje USER_SHARDS. Je-li seznam prázdný, sharding je vypnutý
+#   a vše běží nad výchozí databází (`db.session`) jako dřív.
+# - Uživatel se do shardu přiřazuje podle ID - hashem (USER_SHARD_STRATEGY = "hash")
+#   nebo podle rozsahů ID ("range", horní meze v USER_SHARD_RANGES).
+# - Globálně unikátní ID a unikátnost username/email zajišťuje vyhledávací tabulka
+#   `user_directory` ve výchozí databázi. ID se přidělí vložením do ní,
+#   teprve potom se uživatel uloží do svého shardu.
+#
+# Zápis do adresáře a do shardu nejsou jedna distribuovaná transakce. Zdrojem pravdy
+# je adresář: commit proběhne nejdřív ve výchozí databázi (adresář s příznakem
+# `pending`, počítadla, statistiky, checkpoint importu), potom na shardech a nakonec
+# se příznak smaže. Pokud commit shardu selže nebo proces mezitím spadne, zůstane
+# v adresáři nedokončený zápis a `reconcile()` ho podle adresáře dokončí - zápis
+# na shard je idempotentní (upsert/delete podle ID).
+#
+# Zámky se berou vždy ve stejném pořadí - nejdřív řádek adresáře, pak řádek na shardu -
+# aby souběžný požadavek a reconcile() nemohly čekat jeden na druhého.
+
+import bisect
+import datetime
+import itertools
+import zlib
+
+from flask import current_app, g
+from sqlalchemy import delete, func, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .db import db
+from .models import User, UserDirectory
+
+
+class UserShards:
+    """
+    Rozšíření Flasku, které směruje práci s modelem User do správného shardu.
+    Při vypnutém shardingu všechny metody pracují s `db.session`.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Nastavení USER_SHARD* je v config.py
+        shards = app.config["USER_SHARDS"]
+        binds = app.config.get("SQLALCHEMY_BINDS") or {}
+        missing = [key for key in shards if key not in binds]
+        if missing:
+            raise RuntimeError(f"Shardy {missing} nejsou definované v SQLALCHEMY_BINDS.")
+        if app.config["USER_SHARD_STRATEGY"] == "range" and shards:
+            if len(app.config["USER_SHARD_RANGES"]) != len(shards) - 1:
+                raise RuntimeError(
+                    "USER_SHARD_RANGES musí obsahovat horní meze ID "
+                    "pro všechny shardy kromě posledního."
+                )
+
+        app.extensions["user_shards"] = self
+        app.teardown_appcontext(self._close_sessions)
+
+    # --- Směrování ---
+
+    @staticmethod
+    def enabled():
+        return bool(current_app.config["USER_SHARDS"])
+
+    @staticmethod
+    def shard_for(user_id):
+        """Vrátí klíč shardu (bind key), do kterého patří uživatel s daným ID."""
+        shards = current_app.config["USER_SHARDS"]
+        if current_app.config["USER_SHARD_STRATEGY"] == "range":
+            # Horní meze jsou exkluzivní: ID < ranges[0] => shard 0, atd.
+            ranges = current_app.config["USER_SHARD_RANGES"]
+            index = bisect.bisect_right(ranges, user_id)
+        else:
+            # crc32 je stabilní napříč procesy (na rozdíl od vestavěného hash())
+            index = zlib.crc32(str(user_id).encode()) % len(shards)
+        return shards[index]
+
+    def session_for(self, user_id):
+        """Session pro shard daného uživatele (bez shardingu `db.session`)."""
+        if not self.enabled():
+            return db.session
+        return self._session(self.shard_for(user_id))
+
+    def sessions(self):
+        """Sessions všech shardů v pořadí podle USER_SHARDS (bez shardingu `[db.session]`)."""
+        if not self.enabled():
+            return [db.session]
+        return [self._session(key) for key in current_app.config["USER_SHARDS"]]
+
+    @staticmethod
+    def _session(key):
+        # Jedna session na shard a aplikační kontext (požadavek, úlohu workeru)
+        sessions = g.setdefault("_user_shard_sessions", {})
+        if key not in sessions:
+            sessions[key] = Session(bind=db.engines[key])
+        return sessions[key]
+
+    @staticmethod
+    def _close_sessions(exc):
+        g.pop("_user_shard_pending", None)
+        for session in g.pop("_user_shard_sessions", {}).values():
+            session.close()
+
+    @staticmethod
+    def _track_pending(ids):
+        # ID s nedokončeným zápisem v aktuální transakci - příznak smaže commit()
+        g.setdefault("_user_shard_pending", set()).update(ids)
+
+    # --- Čtení ---
+
+    def scatter_gather(self, stmt, key):
+        """
+        Spustí dotaz na všech shardech a výsledky seřadí podle `key`.
+        Řazení v databázi se řídí její collation (např. en_US.UTF-8 na PostgreSQL),
+        které se od pořadí v Pythonu liší u velkých písmen a diakritiky - výsledky
+        proto řadíme znovu v Pythonu. Každý shard vrací už (téměř) seřazený běh
+        a Timsort takové běhy jen slije, cena je tedy blízká lineární.
+        """
+        results = [session.scalars(stmt).all() for session in self.sessions()]
+        if len(results) == 1:
+            return results[0]
+        return sorted(itertools.chain.from_iterable(results), key=key)
+
+    def identity_taken(self, username, email):
+        """Zda už existuje uživatel s daným username nebo emailem (globálně)."""
+        model = UserDirectory if self.enabled() else User
+        return db.session.scalar(
+            select(model.id)
+            .where(or_(model.username == username, model.email == email))
+            .limit(1)
+        ) is not None
+
+    def existing_identities(self, usernames, emails):
+        """Vrátí dvojice (username, email) existujících uživatelů pro dávkovou kontrolu."""
+        model = UserDirectory if self.enabled() else User
+        return db.session.execute(
+            select(model.username, model.email).where(
+                or_(model.username.in_(usernames), model.email.in_(emails))
+            )
+        ).all()
+
+    # --- Zápis ---
+
+    def add_user(self, user):
+        """
+        Vloží nového uživatele. Se shardingem nejdřív zapíše adresář (přidělí ID
+        a ověří unikátnost), pak uživatele v jeho shardu. Vše se odešle (flush),
+        commit provede `commit()`.
+        """
+        if not self.enabled():
+            db.session.add(user)
+            db.session.flush()
+            return
+        # Čas vytvoření se ukládá i do adresáře, aby šlo řádek na shardu obnovit
+        if user.created_at is None:
+            user.created_at = datetime.datetime.now(datetime.timezone.utc)
+        entry = UserDirectory(
+            username=user.username,
+            email=user.email,
+            created_at=user.created_at,
+            pending=UserDirectory.PENDING_UPSERT,
+        )
+        db.session.add(entry)
+        db.session.flush()  # IntegrityError při duplicitě
+        user.id = entry.id
+        session = self.session_for(user.id)
+        session.add(user)
+        session.flush()
+        self._track_pending([user.id])
+
+    def allocate(self, rows):
+        """
+        Pro hromadné vkládání: zapíše řádky do adresáře, doplní jim přidělená ID
+        a rozdělí je podle shardů. Vrací seznam dvojic (session, řádky).
+        """
+        if not self.enabled():
+            return [(db.session, rows)]
+        ids = db.session.scalars(
+            insert(UserDirectory).returning(
+                UserDirectory.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "username": row["username"],
+                    "email": row["email"],
+                    "created_at": row.get("created_at"),
+                    "pending": UserDirectory.PENDING_UPSERT,
+                }
+                for row in rows
+            ],
+        ).all()
+        self._track_pending(ids)
+        by_shard = {}
+        for user_id, row in zip(ids, rows):
+            row["id"] = user_id
+            by_shard.setdefault(self.shard_for(user_id), []).append(row)
+        return [(self._session(key), shard_rows) for key, shard_rows in by_shard.items()]
+
+    def update_directory(self, user):
+        """Promítne změnu username/email do adresáře (kontrola globální unikátnosti)."""
+        if not self.enabled():
+            return
+        db.session.execute(
+            update(UserDirectory)
+            .where(UserDirectory.id == user.id)
+            .values(
+                username=user.username,
+                email=user.email,
+                pending=UserDirectory.PENDING_UPSERT,
+            )
+        )
+        self._track_pending([user.id])
+
+    def remove_user(self, user):
+        """Smaže uživatele ze shardu; záznam v adresáři smaže až commit()."""
+        session = self.session_for(user.id)
+        if self.enabled():
+            db.session.execute(
+                update(UserDirectory)
+                .where(UserDirectory.id == user.id)
+                .values(pending=UserDirectory.PENDING_DELETE)
+            )
+            self._track_pending([user.id])
+        session.delete(user)
+        session.flush()
+
+    def commit(self):
+        """
+        Potvrdí změny - nejdřív výchozí databázi (adresář s příznakem `pending`,
+        počítadla, statistiky), pak shardy, nakonec smaže příznaky.
+        Selže-li commit shardu, zápis se hned dokončí z adresáře (reconcile);
+        pokud se nepovede ani to, zůstane nedokončený pro `flask user-shards reconcile`.
+        Zápis je v tu chvíli už platný (adresář, počítadla i statistiky jsou potvrzené),
+        proto se chyba jen zaloguje a nevyhazuje - klient by jinak dostal chybu
+        za zápis, který se provedl, a opakování by skončilo konfliktem.
+        """
+        if not self.enabled():
+            db.session.commit()
+            return
+        sessions = g.get("_user_shard_sessions", {})
+        pending = g.pop("_user_shard_pending", set())
+        # Chyby na shardech (např. unikátnost) se projeví ještě před commitem adresáře
+        for session in sessions.values():
+            session.flush()
+        db.session.commit()
+        try:
+            for session in sessions.values():
+                session.commit()
+        except Exception:
+            current_app.logger.exception("Commit shardu selhal, dokončuji z adresáře")
+            for session in sessions.values():
+                session.rollback()
+            try:
+                self.reconcile(pending)
+            except Exception:
+                current_app.logger.exception(
+                    "Zápis na shard zůstává nedokončený (ID %s), dokončí ho "
+                    "`flask user-shards reconcile`", sorted(pending)
+                )
+            return
+        self._settle(pending)
+
+    def rollback(self):
+        g.pop("_user_shard_pending", None)
+        for session in g.get("_user_shard_sessions", {}).values():
+            session.rollback()
+        db.session.rollback()
+
+    def reconcile(self, ids=None, batch_size=1000):
+        """
+        Dokončí nedokončené zápisy na shardech podle adresáře (po pádu procesu
+        nebo chybě commitu shardu). Volitelně jen pro daná ID. Vrací počet
+        dokončených zápisů. Zápisy jsou idempotentní, opakované spuštění nevadí.
+        """
+        if not self.enabled():
+            return 0
+        done = 0
+        while True:
+            stmt = (
+                select(UserDirectory)
+                .where(UserDirectory.pending.is_not(None))
+                .order_by(UserDirectory.id)
+                .limit(batch_size)
+                .with_for_update()  # Souběžný zápis stejného uživatele počká
+            )
+            if ids is not None:
+                stmt = stmt.where(UserDirectory.id.in_(ids))
+            entries = db.session.scalars(stmt).all()
+            if not entries:
+                db.session.commit()
+                return done
+            self._apply(entries)
+            self._settle([entry.id for entry in entries])
+            done += len(entries)
+
+    def _apply(self, entries):
+        # Zapíše stav z adresáře na shardy (upsert podle ID, resp. smazání)
+        by_shard = {}
+        for entry in entries:
+            by_shard.setdefault(self.shard_for(entry.id), []).append(entry)
+        try:
+            for key, group in by_shard.items():
+                session = self._session(key)
+                deleted = [
+                    entry.id for entry in group
+                    if entry.pending == UserDirectory.PENDING_DELETE
+                ]
+                if deleted:
+                    session.execute(delete(User).where(User.id.in_(deleted)))
+                upserts = [
+                    {
+                        "id": entry.id,
+                        "username": entry.username,
+                        "email": entry.email,
+                        "created_at": entry.created_at,
+                    }
+                    for entry in group
+                    if entry.pending == UserDirectory.PENDING_UPSERT
+                ]
+                if upserts:
+                    _upsert_users(session, upserts)
+            for key in by_shard:
+                self._session(key).commit()
+        except Exception:
+            for key in by_shard:
+                self._session(key).rollback()
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _settle(ids):
+        # Shardy odpovídají adresáři - smažeme příznaky, resp. záznamy smazaných uživatelů
+        if not ids:
+            return
+        ids = list(ids)
+        db.session.execute(
+            update(UserDirectory)
+            .where(UserDirectory.id.in_(ids),
+                   UserDirectory.pending == UserDirectory.PENDING_UPSERT)
+            .values(pending=None)
+        )
+        db.session.execute(
+            delete(UserDirectory).where(
+                UserDirectory.id.in_(ids),
+                UserDirectory.pending == UserDirectory.PENDING_DELETE,
+            )
+        )
+        db.session.commit()
+
+    # --- Správa ---
+
+    def create_all(self):
+        """Vytvoří tabulku uživatelů ve všech shardech (pokud ještě neexistuje)."""
+        for key in current_app.config["USER_SHARDS"]:
+            User.__table__.create(bind=db.engines[key], checkfirst=True)
+
+    @staticmethod
+    def unmigrated_count():
+        """Počet uživatelů, kteří zůstali v tabulce `users` výchozí databáze."""
+        return db.session.scalar(select(func.count()).select_from(User))
+
+    def migrate(self, batch_size=1000):
+        """
+        Přesune uživatele z tabulky `users` ve výchozí databáze (stav před zapnutím
+        shardingu) do adresáře a shardů se zachováním ID. Po dávkách: zápis do adresáře,
+        zápis na shardy (reconcile), smazání z výchozí tabulky. Po přerušení lze
+        spustit znovu. Vrací počet přesunutých uživatelů.
+        """
+        moved = 0
+        while True:
+            users = db.session.execute(
+                select(User.id, User.username, User.email, User.created_at)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+            if not users:
+                break
+            ids = [user.id for user in users]
+            known = {
+                entry.id: entry
+                for entry in db.session.scalars(
+                    select(UserDirectory).where(UserDirectory.id.in_(ids))
+                )
+            }
+            new = []
+            for user in users:
+                entry = known.get(user.id)
+                if entry is None:
+                    new.append(user)
+                elif (entry.username, entry.email) != (user.username, user.email):
+                    # ID už přidělil adresář jinému uživateli (sharding běžel před migrací)
+                    raise RuntimeError(
+                        f"Konflikt ID {user.id}: v adresáři je jiný uživatel."
+                    )
+            if new:
+                db.session.execute(
+                    insert(UserDirectory),
+                    [
+                        {
+                            "id": user.id,
+                            "username": user.username,
+                            "email": user.email,
+                            "created_at": user.created_at,
+                            "pending": UserDirectory.PENDING_UPSERT,
+                        }
+                        for user in new
+                    ],
+                )
+            db.session.commit()
+            self.reconcile(ids)
+            db.session.execute(delete(User).where(User.id.in_(ids)))
+            db.session.commit()
+            moved += len(users)
+
+        if db.session.get_bind().dialect.name == "postgresql":
+            # Explicitně vložená ID neposouvají sekvenci - nová ID musí navazovat
+            db.session.execute(text(
+                "SELECT setval(pg_get_serial_sequence('user_directory', 'id'), "
+                "COALESCE((SELECT MAX(id) FROM user_directory), 1))"
+            ))
+            db.session.commit()
+        return moved
+
+
+def _upsert_users(session, rows):
+    """Vloží uživatele na shard, existující (podle ID) přepíše."""
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(User)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={
+                "username": stmt.excluded.username,
+                "email": stmt.excluded.email,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+        session.execute(stmt, rows)
+    else:
+        session.execute(delete(User).where(User.id.in_([row["id"] for row in rows])))
+        session.execute(insert(User), rows)
+
+
+shards = UserShards()
@@ -0,0 +1,128 @@
+# Tento soubor implementuje slučování souběžných identických požadavků (single-flight).
+#
+# Když stejný GET požadavek (stejná cesta, query a relevantní hlavičky) přijde vícekrát
+# současně, dotaz do databáze a serializaci provede jen první z nich ("leader").
+# Ostatní počkají a dostanou stejné serializované tělo odpovědi.
+# Nejde o cache - jakmile výpočet skončí, další požadavek už počítá znovu.
+#
+# Zápisy volají `singleflight.forget(...)`, čímž rozpracované výpočty "odpojí":
+# požadavek, který přijde po dokončeném zápisu, se už k výpočtu spuštěnému
+# před zápisem nepřipojí a nedostane tak zastaralá data.
+#
+# Stav je sdílený jen v rámci jednoho procesu (vlákna jednoho serveru/workeru).
+
+import functools
+import threading
+
+from flask import current_app, request
+
+# Metody, u kterých je slučování bezpečné (nemění data)
+SAFE_METHODS = {"GET"}
+
+
+class _Call:
+    """Jeden rozpracovaný výpočet, na jehož výsledek mohou čekat další požadavky."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Registr rozpracovaných výpočtů podle klíče."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Zavolá `fn()`, pokud pro `key` neběží žádný výpočet; jinak počká na běžící.
+        Vrací dvojici (výsledek, sdíleno), kde `sdíleno` značí převzatý výsledek.
+        Výjimka z `fn()` se předá všem čekajícím.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                call.followers += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # Klíč mohl být mezitím zapomenut (zápis) a obsazen novým výpočtem
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def forget(self, path_prefix=""):
+        """
+        Odpojí rozpracované výpočty pro cesty začínající `path_prefix`.
+        Již čekající požadavky dostanou výsledek, nové spustí vlastní výpočet.
+        """
+        with self._lock:
+            for key in [k for k in self._calls if k[0].startswith(path_prefix)]:
+                del self._calls[key]
+
+    def in_flight(self):
+        """Počet právě rozpracovaných výpočtů (pro ladění a testy)."""
+        with self._lock:
+            return len(self._calls)
+
+
+def _request_key():
+    """Klíč požadavku: cesta, seřazené query parametry a hlavičky ze SINGLEFLIGHT_VARY."""
+    headers = tuple(
+        (name, request.headers.get(name, ""))
+        for name in current_app.config["SINGLEFLIGHT_VARY"]
+    )
+    query = tuple(sorted(request.args.items(multi=True)))
+    return (request.path, query, headers)
+
+
+def coalesce(view):
+    """
+    Dekorátor pro idempotentní GET metody (MethodView) - souběžné identické požadavky
+    sdílí jeden výpočet. Používá se jako nejvrchnější dekorátor (nad @response),
+    aby se sdílelo už hotové serializované tělo odpovědi.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if (
+            not current_app.config["SINGLEFLIGHT_ENABLED"]
+            or request.method not in SAFE_METHODS
+        ):
+            return view(*args, **kwargs)
+
+        def compute():
+            response = current_app.make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code, list(response.headers)
+
+        (body, status, headers), shared = singleflight.do(_request_key(), compute)
+        response = current_app.response_class(body, status=status, headers=headers)
+        if shared:
+            response.headers["X-Coalesced"] = "1"
+        return response
+
+    return wrapper
+
+
+# Sdílená instance pro celý proces
+singleflight = SingleFlight()
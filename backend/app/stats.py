@@ -0,0 +1,130 @@
+# Tento soubor udržuje předpočítané statistiky registrací uživatelů (rollupy).
+#
+# Místo stahování všech uživatelů a seskupování podle `created_at` na klientovi
+# držíme v tabulce `user_signup_rollups` počty registrací za den, týden a měsíc.
+# Při vytvoření/smazání uživatele se v téže transakci upraví příslušné řádky,
+# takže dotaz na statistiky stojí O(počet období), ne O(počet uživatelů).
+
+import datetime
+from collections import Counter
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .counters import lock_against_writes
+from .db import db
+from .models import User, UserSignupRollup
+
+PERIODS = ("day", "week", "month")
+
+
+def bucket_start(value, period):
+    """Vrátí začátek období (datum v UTC), do kterého spadá čas `value`."""
+    if value.tzinfo is None:
+        # SQLite vrací časy bez zóny - func.now() tam ukládá UTC
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    day = value.astimezone(datetime.timezone.utc).date()
+    if period == "day":
+        return day
+    if period == "week":
+        return day - datetime.timedelta(days=day.weekday())  # Pondělí (ISO týden)
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Neznámé období: {period}")
+
+
+def _bucket_counts(created_ats):
+    """Spočítá registrace po obdobích: {(období, začátek): počet}."""
+    counts = Counter()
+    for created_at in created_ats:
+        if created_at is None:
+            continue
+        for period in PERIODS:
+            counts[(period, bucket_start(created_at, period))] += 1
+    return counts
+
+
+def record_signups(created_ats, sign=1):
+    """
+    Upraví rollupy v rámci aktuální transakce - pro nově vytvořené uživatele
+    `sign=1`, pro smazané `sign=-1`. Volá se před commitem spolu se zápisem uživatelů.
+    """
+    counts = _bucket_counts(created_ats)
+    if not counts:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    for (period, bucket), count in counts.items():
+        delta = sign * count
+        if dialect in ("postgresql", "sqlite"):
+            # Atomický "upsert" - bezpečný i při souběžných registracích
+            dialect_insert = (postgresql if dialect == "postgresql" else sqlite).insert
+            stmt = dialect_insert(UserSignupRollup).values(
+                period=period, bucket=bucket, count=delta
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserSignupRollup.period, UserSignupRollup.bucket],
+                set_={"count": UserSignupRollup.count + delta},
+            )
+            db.session.execute(stmt)
+        else:
+            result = db.session.execute(
+                update(UserSignupRollup)
+                .where(UserSignupRollup.period == period,
+                       UserSignupRollup.bucket == bucket)
+                .values(count=UserSignupRollup.count + delta)
+            )
+            if result.rowcount == 0:
+                db.session.execute(
+                    insert(UserSignupRollup).values(
+                        period=period, bucket=bucket, count=delta
+                    )
+                )
+
+
+def rebuild_rollups(sessions=None, batch_size=10000):
+    """
+    Přepočítá všechny rollupy z tabulky uživatelů (např. po ručním zásahu do dat).
+    Uživatelé se čtou po dávkách, takže se nenačítají do paměti všichni najednou.
+    `sessions` jsou databáze s uživateli (shardy); výchozí je `db.session`.
+    Po dobu přepočtu jsou tabulky uživatelů zamčené proti zápisům (stejně jako
+    v init_counter) - jinak by registrace během přepočtu ve výsledku chyběla.
+    """
+    sessions = sessions or [db.session]
+    for session in sessions:
+        lock_against_writes(User, session)
+    db.session.execute(delete(UserSignupRollup))
+    stmt = select(User.created_at).execution_options(yield_per=batch_size)
+    counts = Counter()
+    for session in sessions:
+        counts.update(_bucket_counts(session.scalars(stmt)))
+    if counts:
+        db.session.execute(
+            insert(UserSignupRollup),
+            [
+                {"period": period, "bucket": bucket, "count": count}
+                for (period, bucket), count in sorted(counts.items())
+            ],
+        )
+    db.session.commit()
+    # Commit na shardech jen uvolní zámky (nic se v nich neměnilo)
+    for session in sessions:
+        if session is not db.session:
+            session.commit()
+    return len(counts)
+
+
+def query_rollups(period, start=None, end=None):
+    """Vrátí rollupy daného období seřazené podle data (volitelně v rozsahu start-end)."""
+    stmt = select(UserSignupRollup).where(
+        UserSignupRollup.period == period, UserSignupRollup.count > 0
+    )
+    if start is not None:
+        # Období, ve kterém `start` leží, do výsledku patří celé
+        start_of_bucket = bucket_start(
+            datetime.datetime.combine(start, datetime.time()), period
+        )
+        stmt = stmt.where(UserSignupRollup.bucket >= start_of_bucket)
+    if end is not None:
+        stmt = stmt.where(UserSignupRollup.bucket <= end)
+    return db.session.scalars(stmt.order_by(UserSignupRollup.bucket)).all()
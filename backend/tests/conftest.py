@@ -0,0 +1,66 @@
+# Sdílené pytest fixtures pro testy jednotlivých rozšíření aplikace.
+# Každý test dostane čerstvou aplikaci s prázdnou in-memory databází.
+
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.db import db
+
+
+@pytest.fixture
+def make_app():
+    """
+    Továrna na testovací aplikace. Klíčové argumenty přepíší hodnoty z TestingConfig,
+    např. `make_app(COMPRESS_MIN_SIZE=0)`.
+    """
+    contexts = []
+
+    def _make_app(**overrides):
+        config = type("TestOverrideConfig", (TestingConfig,), overrides)
+        flask_app = create_app("testing", config_override=config)
+        ctx = flask_app.app_context()
+        ctx.push()
+        # Jen výchozí databáze - `db` si pamatuje bind klíče i z dříve vytvořených
+        # aplikací (např. shardy z test_sharding.py), které tato aplikace nemusí mít
+        db.create_all(bind_key=None)
+        contexts.append(ctx)
+        return flask_app
+
+    yield _make_app
+
+    # Úklid - smazání tabulek a uvolnění kontextů v opačném pořadí
+    for ctx in reversed(contexts):
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        ctx.pop()
+
+
+@pytest.fixture
+def create_user():
+    """
+    Pomocník pro vytvoření uživatele přes API (POST /api/v1/users).
+    Ověří úspěch a vrátí ID nového uživatele, např. `create_user(client, "alice")`.
+    """
+
+    def _create_user(client, username):
+        response = client.post(
+            "/api/v1/users",
+            json={"username": username, "email": f"{username}@example.com"},
+        )
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["id"]
+
+    return _create_user
+
+
+@pytest.fixture
+def app(make_app):
+    """Testovací aplikace s výchozí TestingConfig."""
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    """Testovací klient pro výchozí aplikaci."""
+    return app.test_client()
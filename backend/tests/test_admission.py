@@ -0,0 +1,73 @@
+# Testy řízení přístupu a odmítání zátěže (app/admission.py).
+
+from app.admission import AdaptiveLimit
+
+
+def _hold_slots(app, priority, count):
+    """Simuluje `count` rozpracovaných požadavků dané priority."""
+    app.extensions["admission"]["in_flight"][priority] = count
+
+
+def test_requests_are_admitted_and_counted(client):
+    assert client.get("/api/v1/users").status_code == 200
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "alice@example.com"}
+    )
+    assert response.status_code == 201
+
+    metrics = client.get("/api/v1/admission").get_json()
+    assert metrics["admitted"] == {"read": 1, "write": 1}
+    assert metrics["shed"] == {"read": 0, "write": 0}
+    assert metrics["in_flight"] == {"read": 0, "write": 0}
+
+
+def test_over_limit_is_rejected_with_retry_after(make_app):
+    app = make_app(ADMISSION_INITIAL_LIMIT=2, ADMISSION_MIN_LIMIT=2,
+                   ADMISSION_RETRY_AFTER=5)
+    client = app.test_client()
+    _hold_slots(app, "write", 2)
+
+    response = client.get("/api/v1/users")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+    # Metriky jsou z řízení přístupu vyjmuté - odpovídají i při přetížení
+    metrics = client.get("/api/v1/admission").get_json()
+    assert metrics["shed"]["read"] == 1
+
+
+def test_reads_are_shed_before_writes(make_app):
+    app = make_app(ADMISSION_INITIAL_LIMIT=10, ADMISSION_MIN_LIMIT=10,
+                   ADMISSION_PRIORITIES={"write": 1.0, "read": 0.5})
+    client = app.test_client()
+    _hold_slots(app, "read", 5)
+
+    assert client.get("/api/v1/users").status_code == 503
+    response = client.post(
+        "/api/v1/users", json={"username": "bob", "email": "bob@example.com"}
+    )
+    assert response.status_code == 201
+
+
+def test_admission_can_be_disabled(make_app):
+    app = make_app(ADMISSION_ENABLED=False, ADMISSION_INITIAL_LIMIT=1,
+                   ADMISSION_MIN_LIMIT=1)
+    _hold_slots(app, "read", 100)
+    assert app.test_client().get("/api/v1/users").status_code == 200
+
+
+def test_adaptive_limit_backs_off_on_latency_and_pool_saturation():
+    limit = AdaptiveLimit(initial=50, min_limit=2, max_limit=100)
+    for _ in range(20):
+        limit.update(0.01, in_flight=50, pool_saturation=0.0)
+    steady = limit.limit
+    assert steady > 50  # Stabilní latence a vytížený limit => růst
+
+    for _ in range(20):
+        limit.update(0.5, in_flight=50, pool_saturation=0.0)
+    assert limit.limit < steady  # Nárůst latence => pokles
+
+    saturated = AdaptiveLimit(initial=50, min_limit=2, max_limit=100)
+    for _ in range(20):
+        saturated.update(0.01, in_flight=10, pool_saturation=1.0)
+    assert saturated.limit < 50  # Čekání na DB spojení => pokles
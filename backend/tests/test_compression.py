@@ -0,0 +1,121 @@
+# Testy komprese odpovědí (app/compression.py).
+
+import gzip
+import json
+import zlib
+
+from flask import Response, stream_with_context
+
+from app.db import db
+from app.models import User
+
+
+def _seed_users(count):
+    for i in range(count):
+        db.session.add(User(username=f"user{i:04d}", email=f"user{i:04d}@example.com"))
+    db.session.commit()
+
+
+def test_large_user_list_is_gzipped(client):
+    """Velký seznam uživatelů se při `Accept-Encoding: gzip` komprimuje."""
+    _seed_users(50)
+    response = client.get("/api/v1/users", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    data = json.loads(gzip.decompress(response.get_data()))
+    assert len(data) == 50
+    assert int(response.headers["Content-Length"]) == len(response.get_data())
+
+
+def test_no_compression_without_accept_encoding(client):
+    """Klient bez `Accept-Encoding` dostane nekomprimovanou odpověď."""
+    _seed_users(50)
+    response = client.get("/api/v1/users")
+    assert "Content-Encoding" not in response.headers
+    assert len(response.get_json()) == 50
+
+
+def test_identity_only_client_is_respected(client):
+    """`gzip;q=0` znamená, že klient gzip výslovně odmítá."""
+    _seed_users(50)
+    response = client.get("/api/v1/users", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_small_response_is_not_compressed(client):
+    """Odpovědi menší než COMPRESS_MIN_SIZE se nekomprimují."""
+    response = client.get("/api/v1/users", headers={"Accept-Encoding": "gzip"})
+    assert response.get_json() == []
+    assert "Content-Encoding" not in response.headers
+
+
+def test_already_encoded_response_is_skipped(make_app):
+    """Odpověď, která už má Content-Encoding, se znovu nekomprimuje."""
+    app = make_app(COMPRESS_MIN_SIZE=0)
+
+    @app.route("/precompressed")
+    def precompressed():
+        body = gzip.compress(b"x" * 1000)
+        return Response(
+            body, mimetype="text/plain", headers={"Content-Encoding": "gzip"}
+        )
+
+    response = app.test_client().get(
+        "/precompressed", headers={"Accept-Encoding": "gzip"}
+    )
+    assert gzip.decompress(response.get_data()) == b"x" * 1000
+
+
+def test_streamed_response_is_compressed_incrementally(make_app):
+    """Streamovaná odpověď se komprimuje a odesílá po kusech, nemá Content-Length."""
+    app = make_app()
+    produced = []
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            for i in range(100):
+                produced.append(i)
+                yield json.dumps({"row": i}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    response = app.test_client().get(
+        "/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    # První kus komprimovaných dat musí jít rozbalit dřív, než generátor doběhne
+    decompressor = zlib.decompressobj(31)
+    chunks = iter(response.response)
+    first = b""
+    while not first:
+        first = decompressor.decompress(next(chunks))
+    assert first.decode() == json.dumps({"row": 0}) + "\n"
+    assert len(produced) < 100
+
+    rest = b"".join(decompressor.decompress(chunk) for chunk in chunks)
+    rest += decompressor.flush()
+    response.close()
+    lines = (first + rest).decode().splitlines()
+    assert len(lines) == 100
+    assert json.loads(lines[-1]) == {"row": 99}
+
+
+def test_compression_level_is_configurable(make_app):
+    """COMPRESS_LEVEL ovlivňuje výslednou velikost odpovědi."""
+    sizes = {}
+    for level in (0, 9):
+        app = make_app(COMPRESS_LEVEL=level)
+        _seed_users(200)
+        response = app.test_client().get(
+            "/api/v1/users", headers={"Accept-Encoding": "gzip"}
+        )
+        sizes[level] = len(response.get_data())
+        db.session.query(User).delete()
+        db.session.commit()
+    # Úroveň 0 = data jen zabalená do gzip bez komprese
+    assert sizes[9] < sizes[0]
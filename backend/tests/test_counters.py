@@ -0,0 +1,87 @@
+# Testy celkového počtu uživatelů v hlavičce X-Total-Count (app/counters.py).
+
+import pytest
+
+from app.counters import clear_estimate_cache, init_counter
+from app.db import db
+from app.models import TableCounter, User
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    clear_estimate_cache()
+    yield
+    clear_estimate_cache()
+
+
+def test_no_header_without_count_param(client):
+    response = client.get("/api/v1/users")
+    assert "X-Total-Count" not in response.headers
+
+
+def test_exact_count(client, create_user):
+    create_user(client, "alice")
+    create_user(client, "bob")
+    response = client.get("/api/v1/users?count=exact")
+    assert response.headers["X-Total-Count"] == "2"
+
+
+def test_invalid_count_mode(client):
+    assert client.get("/api/v1/users?count=guess").status_code == 422
+
+
+def test_estimated_count_is_cached(make_app, create_user):
+    app = make_app(COUNT_ESTIMATE_TTL=60)
+    client = app.test_client()
+    create_user(client, "alice")
+    assert client.get("/api/v1/users?count=estimated").headers["X-Total-Count"] == "1"
+
+    # Během TTL se vrací cachovaná hodnota (SQLite nemá statistiky => přesný počet)
+    create_user(client, "bob")
+    assert client.get("/api/v1/users?count=estimated").headers["X-Total-Count"] == "1"
+
+    clear_estimate_cache()
+    assert client.get("/api/v1/users?count=estimated").headers["X-Total-Count"] == "2"
+
+
+def test_counter_without_init_falls_back_to_exact(client, create_user):
+    create_user(client, "alice")
+    # Nezaložené počítadlo se při čtení nevytváří - vrací se přesný počet
+    assert client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "1"
+    assert db.session.get(TableCounter, "users") is None
+
+
+def test_counter_is_initialized_and_maintained(client, create_user):
+    create_user(client, "alice")
+    result = client.application.test_cli_runner().invoke(args=["counters", "init"])
+    assert result.exit_code == 0, result.output
+    assert db.session.get(TableCounter, "users").value == 1
+    assert client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "1"
+
+    bob_id = create_user(client, "bob")
+    create_user(client, "carol")
+    assert client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "3"
+
+    assert client.delete(f"/api/v1/users/{bob_id}").status_code == 204
+    assert client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "2"
+
+
+def test_counter_init_recomputes_existing_counter(app):
+    db.session.add(User(username="alice", email="alice@example.com"))
+    db.session.add(TableCounter(name="users", value=42))
+    db.session.commit()
+    assert init_counter(User) == 1
+    db.session.expire_all()
+    assert db.session.get(TableCounter, "users").value == 1
+
+
+def test_counter_unchanged_on_failed_insert(client, create_user):
+    create_user(client, "alice")
+    init_counter(User)
+    # Duplicitní uživatel se neuloží a počítadlo se nezmění
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "other@example.com"}
+    )
+    assert response.status_code == 409
+    assert client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "1"
+    assert db.session.scalar(db.select(db.func.count(User.id))) == 1
@@ -0,0 +1,193 @@
+# Testy hromadného importu uživatelů (app/imports.py, /api/v1/jobs).
+# V testech běží import synchronně (IMPORT_EXECUTOR = "sync" v TestingConfig).
+
+import io
+import json
+
+import pytest
+
+from app import imports
+from app.counters import init_counter
+from app.db import db
+from app.imports import process_job
+from app.models import ImportJob, User
+
+
+@pytest.fixture
+def import_client(make_app, tmp_path):
+    app = make_app(IMPORT_UPLOAD_FOLDER=str(tmp_path), IMPORT_CHUNK_SIZE=2)
+    return app.test_client()
+
+
+def _upload(client, content, filename):
+    data = {"file": (io.BytesIO(content.encode("utf-8")), filename)}
+    return client.post("/api/v1/jobs", data=data, content_type="multipart/form-data")
+
+
+def test_csv_import_creates_users(import_client, tmp_path):
+    """Platné řádky CSV se uloží, neplatné a duplicitní se zapíšou jako chyby."""
+    db.session.add(User(username="existing", email="existing@example.com"))
+    db.session.commit()
+
+    content = (
+        "username,email\n"
+        "alice,alice@example.com\n"
+        "bob,bob@example.com\n"
+        "x,not-an-email\n"  # krátké jméno i neplatný email
+        "existing,other@example.com\n"  # již existuje v DB
+        "alice,alice2@example.com\n"  # duplicita v rámci souboru
+    )
+    response = _upload(import_client, content, "users.csv")
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+
+    job = import_client.get(f"/api/v1/jobs/{job_id}").get_json()
+    assert job["status"] == "completed"
+    assert job["total_rows"] == 5
+    assert job["processed_rows"] == 5
+    assert job["inserted_rows"] == 2
+    assert job["failed_rows"] == 3
+    assert job["progress"] == 100.0
+    assert db.session.scalar(db.select(db.func.count(User.id))) == 3
+
+    errors = import_client.get(f"/api/v1/jobs/{job_id}/errors").get_json()
+    assert [e["row_number"] for e in errors] == [3, 4, 5]
+    assert "email" in errors[0]["messages"]
+    # Soubor dokončené úlohy se smaže
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_job_keeps_file_for_resume(import_client, tmp_path, monkeypatch):
+    def crash(job, chunk):
+        raise RuntimeError("worker spadl")
+
+    monkeypatch.setattr(imports, "_process_chunk", crash)
+    content = "username,email\njana,jana@example.com\n"
+    job = _upload(import_client, content, "users.csv").get_json()
+    assert job["status"] == "failed"
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.undo()
+    job = import_client.post(f"/api/v1/jobs/{job['id']}/resume").get_json()
+    assert job["status"] == "completed"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_too_large_upload_is_rejected(make_app, tmp_path):
+    app = make_app(IMPORT_UPLOAD_FOLDER=str(tmp_path), MAX_CONTENT_LENGTH=1024)
+    content = "username,email\n" + "x" * 2048
+    response = _upload(app.test_client(), content, "users.csv")
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ndjson_import_reports_invalid_lines(import_client):
+    """Neplatný JSON řádek je chyba daného řádku, ne celé úlohy."""
+    content = "\n".join([
+        json.dumps({"username": "carol", "email": "carol@example.com"}),
+        "{not json",
+        json.dumps({"username": "dave", "email": "dave@example.com"}),
+    ])
+    response = _upload(import_client, content, "users.ndjson")
+    job = response.get_json()
+    assert job["status"] == "completed"
+    assert job["inserted_rows"] == 2
+    assert job["failed_rows"] == 1
+
+
+def test_ndjson_blank_lines_are_skipped(import_client):
+    content = "\n".join([
+        json.dumps({"username": "kate", "email": "kate@example.com"}),
+        "",
+        "   ",
+        json.dumps({"username": "liam", "email": "liam@example.com"}),
+        "",
+    ])
+    job = _upload(import_client, content, "users.ndjson").get_json()
+    assert job["status"] == "completed"
+    assert job["total_rows"] == 2
+    assert job["inserted_rows"] == 2
+    assert job["failed_rows"] == 0
+
+
+def test_unsupported_format_is_rejected(import_client):
+    response = _upload(import_client, "whatever", "users.xlsx")
+    assert response.status_code == 422
+
+
+def test_job_not_found(import_client):
+    assert import_client.get("/api/v1/jobs/9999").status_code == 404
+
+
+def test_resume_continues_from_checkpoint(import_client, tmp_path):
+    """Po pádu workeru se import naváže od uloženého checkpointu bez duplicit."""
+    path = tmp_path / "resume.csv"
+    path.write_text(
+        "username,email\n"
+        "first,first@example.com\n"
+        "second,second@example.com\n"
+        "third,third@example.com\n"
+    )
+    # Simulace stavu po pádu: první řádek už byl uložen, úloha skončila chybou
+    db.session.add(User(username="first", email="first@example.com"))
+    job = ImportJob(
+        filename="resume.csv", file_format="csv", file_path=str(path),
+        status=ImportJob.STATUS_FAILED, processed_rows=1, inserted_rows=1,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    response = import_client.post(f"/api/v1/jobs/{job.id}/resume")
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data["status"] == "completed"
+    assert data["processed_rows"] == 3
+    assert data["inserted_rows"] == 3
+    assert data["failed_rows"] == 0
+
+    # Dokončenou úlohu už navázat nelze
+    assert import_client.post(f"/api/v1/jobs/{job.id}/resume").status_code == 409
+    # Opakované zpracování dokončené úlohy nic nezmění
+    process_job(job.id)
+    assert db.session.scalar(db.select(db.func.count(User.id))) == 3
+
+
+def test_duplicate_missed_by_check_fails_only_its_row(import_client, monkeypatch):
+    """
+    Duplicita, kterou kontrola předem nezachytí (souběžný POST /users), skončí
+    jako chyba jednoho řádku - ostatní řádky dávky se uloží po jednom.
+    """
+    db.session.add(User(username="racer", email="racer@example.com"))
+    db.session.commit()
+    monkeypatch.setattr(imports, "_filter_duplicates", lambda rows: (rows, []))
+
+    content = (
+        "username,email\n"
+        "ivan,ivan@example.com\n"
+        "racer,racer@example.com\n"
+    )
+    job = _upload(import_client, content, "users.csv").get_json()
+    assert job["status"] == "completed"
+    assert job["inserted_rows"] == 1
+    assert job["failed_rows"] == 1
+
+    errors = import_client.get(f"/api/v1/jobs/{job['id']}/errors").get_json()
+    assert [e["row_number"] for e in errors] == [2]
+    assert "_row" in errors[0]["messages"]
+    assert db.session.scalar(db.select(db.func.count(User.id))) == 2
+
+
+def test_import_updates_user_counter(import_client):
+    """Import posouvá udržované počítadlo uživatelů ve stejné transakci jako vložení."""
+    init_counter(User)
+    assert import_client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "0"
+    content = "username,email\nerin,erin@example.com\nfrank,frank@example.com\n"
+    _upload(import_client, content, "users.csv")
+    assert import_client.get("/api/v1/users?count=counter").headers["X-Total-Count"] == "2"
+
+
+def test_import_updates_signup_stats(import_client):
+    content = "username,email\ngina,gina@example.com\nhank,hank@example.com\n"
+    _upload(import_client, content, "users.csv")
+    stats = import_client.get("/api/v1/users/stats?period=month").get_json()
+    assert [s["count"] for s in stats] == [2]
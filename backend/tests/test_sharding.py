@@ -0,0 +1,326 @@
+# Testy shardingu tabulky uživatelů (app/sharding.py) nad několika SQLite soubory.
+
+import io
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.db import db
+from app.models import User, UserDirectory
+from app.sharding import shards
+
+SHARD_KEYS = ["users_0", "users_1", "users_2"]
+
+
+@pytest.fixture
+def sharded_app(make_app, tmp_path):
+    binds = {key: f"sqlite:///{tmp_path / key}.db" for key in SHARD_KEYS}
+    app = make_app(
+        SQLALCHEMY_BINDS=binds,
+        USER_SHARDS=SHARD_KEYS,
+        IMPORT_UPLOAD_FOLDER=str(tmp_path / "uploads"),
+    )
+    shards.create_all()
+    return app
+
+
+@pytest.fixture
+def fail_shard_commits(monkeypatch):
+    """Simulace výpadku shardu - `fail(n)` nastaví, kolik příštích commitů shardu selže."""
+    remaining = [0]
+    original = Session.commit
+
+    def commit(self):
+        # Sessions shardů mají pevný bind, výchozí `db.session` ne
+        if self.bind is not None and remaining[0] > 0:
+            remaining[0] -= 1
+            raise OperationalError("COMMIT", None, Exception("shard je nedostupný"))
+        return original(self)
+
+    monkeypatch.setattr(Session, "commit", commit)
+
+    def fail(times):
+        remaining[0] = times
+
+    return fail
+
+
+def _users_per_shard():
+    return [
+        session.scalar(select(func.count()).select_from(User))
+        for session in shards.sessions()
+    ]
+
+
+def test_users_are_spread_across_shards(sharded_app, create_user):
+    client = sharded_app.test_client()
+    names = [f"user{i:02d}" for i in range(30)]
+    for name in reversed(names):
+        create_user(client, name)
+
+    counts = _users_per_shard()
+    assert sum(counts) == 30
+    assert all(count > 0 for count in counts)
+    # Výchozí databáze uživatele neobsahuje, jen adresář
+    assert db.session.scalar(select(func.count()).select_from(User)) == 0
+    assert db.session.scalar(select(func.count()).select_from(UserDirectory)) == 30
+
+    # Seznam je sloučený ze všech shardů a seřazený podle username
+    response = client.get("/api/v1/users?count=exact")
+    assert [u["username"] for u in response.get_json()] == names
+    assert response.headers["X-Total-Count"] == "30"
+
+
+def test_item_operations_are_routed_by_id(sharded_app, create_user):
+    client = sharded_app.test_client()
+    user_id = create_user(client, "alice")
+    create_user(client, "bob")
+
+    assert client.get(f"/api/v1/users/{user_id}").get_json()["username"] == "alice"
+
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"username": "alice2", "email": "alice2@example.com"},
+    )
+    assert response.status_code == 200
+    shard_session = shards.session_for(user_id)
+    shard_session.expire_all()
+    assert shard_session.get(User, user_id).username == "alice2"
+    assert db.session.get(UserDirectory, user_id).username == "alice2"
+
+    assert client.delete(f"/api/v1/users/{user_id}").status_code == 204
+    assert client.get(f"/api/v1/users/{user_id}").status_code == 404
+    assert db.session.get(UserDirectory, user_id) is None
+    assert sum(_users_per_shard()) == 1
+
+
+def test_global_uniqueness_is_enforced(sharded_app, create_user):
+    client = sharded_app.test_client()
+    create_user(client, "alice")
+    # Druhý uživatel by skončil na jiném shardu, adresář ale duplicitu zachytí
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "other@example.com"}
+    )
+    assert response.status_code == 409
+    response = client.post(
+        "/api/v1/users", json={"username": "other", "email": "alice@example.com"}
+    )
+    assert response.status_code == 409
+    assert sum(_users_per_shard()) == 1
+
+
+def test_range_strategy(make_app, tmp_path, create_user):
+    binds = {key: f"sqlite:///{tmp_path / key}.db" for key in SHARD_KEYS[:2]}
+    app = make_app(SQLALCHEMY_BINDS=binds, USER_SHARDS=SHARD_KEYS[:2],
+                   USER_SHARD_STRATEGY="range", USER_SHARD_RANGES=[3])
+    shards.create_all()
+    client = app.test_client()
+    for i in range(5):
+        create_user(client, f"user{i}")
+    # ID 1-2 patří do prvního shardu, ID 3+ do druhého
+    assert shards.shard_for(2) == "users_0"
+    assert shards.shard_for(3) == "users_1"
+    assert _users_per_shard() == [2, 3]
+
+
+def test_import_and_stats_with_shards(sharded_app, create_user):
+    client = sharded_app.test_client()
+    create_user(client, "existing")
+    content = "username,email\n" + "".join(
+        f"imp{i:02d},imp{i:02d}@example.com\n" for i in range(20)
+    ) + "existing,dup@example.com\n"
+    response = client.post(
+        "/api/v1/jobs",
+        data={"file": (io.BytesIO(content.encode()), "users.csv")},
+        content_type="multipart/form-data",
+    )
+    job = response.get_json()
+    assert job["status"] == "completed"
+    assert job["inserted_rows"] == 20
+    assert job["failed_rows"] == 1
+    assert sum(_users_per_shard()) == 21
+
+    # Statistiky přepočítané ze všech shardů odpovídají průběžně udržovaným
+    before = client.get("/api/v1/users/stats?period=month").get_json()
+    result = sharded_app.test_cli_runner().invoke(args=["user-stats", "rebuild"])
+    assert result.exit_code == 0
+    after = client.get("/api/v1/users/stats?period=month").get_json()
+    assert before == after
+    assert after[0]["count"] == 21
+
+
+def test_merge_does_not_rely_on_database_collation(sharded_app, create_user):
+    client = sharded_app.test_client()
+    names = ["alice", "Bob", "carol", "Dave", "erin", "Frank", "gina", "Hank"]
+    for name in names:
+        create_user(client, name)
+
+    # Shardy řadí podle collation bez ohledu na velikost písmen (jako locale
+    # na PostgreSQL) - výsledek musí být přesto seřazený podle klíče v Pythonu
+    stmt = select(User).order_by(User.username.collate("NOCASE"))
+    users = shards.scatter_gather(stmt, key=lambda user: user.username)
+    assert [user.username for user in users] == sorted(names)
+
+    response = client.get("/api/v1/users")
+    assert [u["username"] for u in response.get_json()] == sorted(names)
+
+
+def test_failed_default_commit_leaves_no_shard_rows(sharded_app, monkeypatch):
+    client = sharded_app.test_client()
+
+    def failing_commit():
+        raise OperationalError("COMMIT", None, Exception("výchozí DB je nedostupná"))
+
+    monkeypatch.setattr(db.session, "commit", failing_commit)
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "alice@example.com"}
+    )
+    assert response.status_code == 500
+    monkeypatch.undo()
+
+    assert sum(_users_per_shard()) == 0
+    assert db.session.scalar(select(func.count()).select_from(UserDirectory)) == 0
+
+
+def test_failed_shard_commit_is_completed_from_directory(
+    sharded_app, fail_shard_commits, create_user
+):
+    client = sharded_app.test_client()
+    fail_shard_commits(1)
+    user_id = create_user(client, "alice")
+
+    assert client.get(f"/api/v1/users/{user_id}").get_json()["username"] == "alice"
+    assert db.session.get(UserDirectory, user_id).pending is None
+
+
+def test_shard_outage_is_reconciled_later(
+    sharded_app, fail_shard_commits, create_user
+):
+    client = sharded_app.test_client()
+    bob_id = create_user(client, "bob")
+
+    # Shard je nedostupný - adresář je potvrzený, zápisy na shard zůstanou rozpracované.
+    # Zápis se přesto hlásí jako úspěšný: proběhl a dokončí se z adresáře.
+    fail_shard_commits(100)
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "alice@example.com"}
+    )
+    assert response.status_code == 201
+    assert response.get_json()["username"] == "alice"
+    assert client.delete(f"/api/v1/users/{bob_id}").status_code == 204
+    fail_shard_commits(0)
+    # Na shardech se změny zatím neprojevily
+    assert [u["username"] for u in client.get("/api/v1/users").get_json()] == ["bob"]
+
+    pending = db.session.scalars(
+        select(UserDirectory.pending).order_by(UserDirectory.username)
+    ).all()
+    assert pending == [UserDirectory.PENDING_UPSERT, UserDirectory.PENDING_DELETE]
+    # Jméno rozpracovaného uživatele už je obsazené
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "other@example.com"}
+    )
+    assert response.status_code == 409
+
+    result = sharded_app.test_cli_runner().invoke(args=["user-shards", "reconcile"])
+    assert result.exit_code == 0, result.output
+    assert "2" in result.output
+    assert [u["username"] for u in client.get("/api/v1/users").get_json()] == ["alice"]
+    entries = db.session.scalars(select(UserDirectory)).all()
+    assert [(e.username, e.pending) for e in entries] == [("alice", None)]
+
+
+def test_import_during_shard_outage_is_reconciled(
+    make_app, tmp_path, fail_shard_commits
+):
+    binds = {key: f"sqlite:///{tmp_path / key}.db" for key in SHARD_KEYS}
+    app = make_app(
+        SQLALCHEMY_BINDS=binds,
+        USER_SHARDS=SHARD_KEYS,
+        IMPORT_UPLOAD_FOLDER=str(tmp_path / "uploads"),
+        IMPORT_CHUNK_SIZE=5,
+    )
+    shards.create_all()
+    client = app.test_client()
+    content = "username,email\n" + "".join(
+        f"imp{i:02d},imp{i:02d}@example.com\n" for i in range(20)
+    )
+
+    # Dávky se potvrdí v adresáři (včetně checkpointu), na shardy už ne
+    fail_shard_commits(1000)
+    job = client.post(
+        "/api/v1/jobs",
+        data={"file": (io.BytesIO(content.encode()), "users.csv")},
+        content_type="multipart/form-data",
+    ).get_json()
+    fail_shard_commits(0)
+    assert job["status"] == "completed"
+    assert job["inserted_rows"] == 20
+    assert sum(_users_per_shard()) == 0
+
+    # Nedokončené zápisy dokončí reconcile (příkaz, nebo start další importní úlohy)
+    # se stejnými ID - bez duplicit
+    result = app.test_cli_runner().invoke(args=["user-shards", "reconcile"])
+    assert result.exit_code == 0, result.output
+    usernames = [u["username"] for u in client.get("/api/v1/users").get_json()]
+    assert usernames == [f"imp{i:02d}" for i in range(20)]
+    assert sum(_users_per_shard()) == 20
+    assert db.session.scalar(
+        select(func.count()).select_from(UserDirectory)
+        .where(UserDirectory.pending.is_not(None))
+    ) == 0
+
+
+def test_import_start_reconciles_pending_writes(
+    sharded_app, fail_shard_commits, create_user
+):
+    client = sharded_app.test_client()
+    fail_shard_commits(100)
+    create_user(client, "alice")
+    fail_shard_commits(0)
+
+    # Worker před zpracováním úlohy dokončí zápisy přerušené dřívějším pádem
+    content = "username,email\nbob,bob@example.com\n"
+    client.post(
+        "/api/v1/jobs",
+        data={"file": (io.BytesIO(content.encode()), "users.csv")},
+        content_type="multipart/form-data",
+    )
+    assert [u["username"] for u in client.get("/api/v1/users").get_json()] == [
+        "alice", "bob"
+    ]
+
+
+def test_migrate_moves_existing_users(sharded_app, create_user):
+    # Uživatelé z doby před zapnutím shardingu leží ve výchozí databázi
+    db.session.add_all(
+        User(username=f"old{i}", email=f"old{i}@example.com") for i in range(5)
+    )
+    db.session.commit()
+    runner = sharded_app.test_cli_runner()
+    result = runner.invoke(args=["user-shards", "create"])
+    assert "user-shards migrate" in result.output
+
+    result = runner.invoke(args=["user-shards", "migrate", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Přesunuto uživatelů: 5" in result.output
+    assert db.session.scalar(select(func.count()).select_from(User)) == 0
+    assert sum(_users_per_shard()) == 5
+
+    client = sharded_app.test_client()
+    response = client.get("/api/v1/users?count=exact")
+    assert [u["username"] for u in response.get_json()] == [f"old{i}" for i in range(5)]
+    assert response.headers["X-Total-Count"] == "5"
+    # Jména přesunutých uživatelů zůstávají obsazená, nová ID navazují
+    response = client.post(
+        "/api/v1/users", json={"username": "old0", "email": "new@example.com"}
+    )
+    assert response.status_code == 409
+    assert create_user(client, "fresh") == 6
+
+
+def test_missing_bind_is_rejected(make_app):
+    with pytest.raises(RuntimeError):
+        make_app(USER_SHARDS=["nope"])
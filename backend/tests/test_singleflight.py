@@ -0,0 +1,190 @@
+# Testy slučování souběžných identických požadavků (app/singleflight.py).
+
+import io
+import threading
+import time
+
+import pytest
+from flask.views import MethodView
+
+from app import imports
+from app.singleflight import SingleFlight, coalesce, singleflight
+
+
+def _wait_for_followers(flight, count, timeout=5):
+    """Počká, až se k rozpracovanému výpočtu připojí `count` dalších požadavků."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with flight._lock:
+            if any(call.followers >= count for call in flight._calls.values()):
+                return
+        time.sleep(0.001)
+    raise AssertionError("Požadavky se k výpočtu nepřipojily")
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "body"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+        for _ in range(3)
+    ]
+    for t in followers:
+        t.start()
+    _wait_for_followers(flight, 3)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("body", False)] + [("body", True)] * 3
+    assert flight.in_flight() == 0
+
+
+def test_error_is_propagated_to_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("k", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=run)
+    follower.start()
+    _wait_for_followers(flight, 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert errors == ["boom", "boom"]
+
+
+def test_forget_detaches_in_flight_call():
+    """Po zápisu (forget) se nový požadavek nepřipojí k výpočtu spuštěnému před ním."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def stale():
+        started.set()
+        release.wait(5)
+        return "before-write"
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(flight.do(("/api/v1/users",), stale))
+    )
+    leader.start()
+    started.wait(5)
+
+    flight.forget("/api/v1/users")
+    fresh = flight.do(("/api/v1/users",), lambda: "after-write")
+    assert fresh == ("after-write", False)
+
+    release.set()
+    leader.join(5)
+    assert results == [("before-write", False)]
+    assert flight.in_flight() == 0
+
+
+@pytest.fixture
+def slow_client(app):
+    """Aplikace s pomalým endpointem, na kterém lze řídit souběh požadavků."""
+    state = {"calls": 0, "started": threading.Event(), "release": threading.Event()}
+
+    class SlowResource(MethodView):
+        @coalesce
+        def get(self):
+            state["calls"] += 1
+            state["started"].set()
+            state["release"].wait(5)
+            return {"calls": state["calls"]}
+
+    app.add_url_rule("/slow", view_func=SlowResource.as_view("slow"))
+    return app.test_client(), state
+
+
+def test_coalesced_requests_share_response(slow_client):
+    client, state = slow_client
+    responses = []
+
+    def get(url):
+        responses.append(client.get(url))
+
+    leader = threading.Thread(target=get, args=("/slow?a=1&b=2",))
+    leader.start()
+    state["started"].wait(5)
+    # Stejné parametry v jiném pořadí => stejný klíč
+    follower = threading.Thread(target=get, args=("/slow?b=2&a=1",))
+    follower.start()
+    _wait_for_followers(singleflight, 1)
+    state["release"].set()
+    leader.join(5)
+    follower.join(5)
+
+    assert state["calls"] == 1
+    assert [r.get_json() for r in responses] == [{"calls": 1}, {"calls": 1}]
+    assert sorted(r.headers.get("X-Coalesced", "0") for r in responses) == ["0", "1"]
+
+
+def test_user_endpoints_still_work(client):
+    response = client.post(
+        "/api/v1/users", json={"username": "alice", "email": "alice@example.com"}
+    )
+    user_id = response.get_json()["id"]
+    assert client.get(f"/api/v1/users/{user_id}").get_json()["username"] == "alice"
+    assert client.get("/api/v1/users/9999").status_code == 404
+    assert len(client.get("/api/v1/users").get_json()) == 1
+    # Dokumentace OpenAPI se generuje i pro obalené metody
+    spec = client.get("/api/docs/openapi.json").get_json()
+    assert "get" in spec["paths"]["/api/v1/users/{user_id}"]
+
+
+def test_import_detaches_in_flight_user_reads(make_app, tmp_path, monkeypatch):
+    app = make_app(IMPORT_UPLOAD_FOLDER=str(tmp_path))
+    client = app.test_client()
+    forgotten = []
+    monkeypatch.setattr(singleflight, "forget", forgotten.append)
+
+    # První pokus selže, aby šlo úlohu navázat
+    def crash(job, chunk):
+        raise RuntimeError("worker spadl")
+
+    original = imports._process_chunk
+    monkeypatch.setattr(imports, "_process_chunk", crash)
+    content = b"username,email\nmona,mona@example.com\n"
+    job = client.post(
+        "/api/v1/jobs",
+        data={"file": (io.BytesIO(content), "users.csv")},
+        content_type="multipart/form-data",
+    ).get_json()
+    assert forgotten == ["/api/v1/users"]
+
+    monkeypatch.setattr(imports, "_process_chunk", original)
+    assert client.post(f"/api/v1/jobs/{job['id']}/resume").status_code == 202
+    assert forgotten == ["/api/v1/users", "/api/v1/users"]
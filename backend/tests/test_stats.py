@@ -0,0 +1,67 @@
+# Testy předpočítaných statistik registrací (app/stats.py, /api/v1/users/stats).
+
+import datetime
+
+from app.db import db
+from app.models import User, UserSignupRollup
+from app.stats import bucket_start
+
+
+def test_bucket_start():
+    value = datetime.datetime(2025, 5, 15, 23, 30, tzinfo=datetime.timezone.utc)
+    assert bucket_start(value, "day") == datetime.date(2025, 5, 15)
+    assert bucket_start(value, "week") == datetime.date(2025, 5, 12)  # pondělí
+    assert bucket_start(value, "month") == datetime.date(2025, 5, 1)
+    # Časy s jinou zónou se převádí na UTC
+    prague = datetime.timezone(datetime.timedelta(hours=2))
+    value = datetime.datetime(2025, 5, 16, 1, 0, tzinfo=prague)
+    assert bucket_start(value, "day") == datetime.date(2025, 5, 15)
+
+
+def test_stats_follow_inserts_and_deletes(client, create_user):
+    create_user(client, "alice")
+    bob_id = create_user(client, "bob")
+
+    stats = client.get("/api/v1/users/stats").get_json()
+    assert len(stats) == 1
+    assert stats[0]["period"] == "day"
+    assert stats[0]["count"] == 2
+
+    month = client.get("/api/v1/users/stats?period=month").get_json()
+    assert month[0]["bucket"].endswith("-01")
+    assert month[0]["count"] == 2
+
+    client.delete(f"/api/v1/users/{bob_id}")
+    assert client.get("/api/v1/users/stats").get_json()[0]["count"] == 1
+
+
+def test_stats_range_and_validation(client):
+    db.session.add_all([
+        User(username="old", email="old@example.com",
+             created_at=datetime.datetime(2024, 1, 10, tzinfo=datetime.timezone.utc)),
+        User(username="new", email="new@example.com",
+             created_at=datetime.datetime(2024, 3, 5, tzinfo=datetime.timezone.utc)),
+    ])
+    db.session.commit()
+    app_cli = client.application.test_cli_runner()
+    result = app_cli.invoke(args=["user-stats", "rebuild"])
+    assert result.exit_code == 0, result.output
+
+    stats = client.get(
+        "/api/v1/users/stats?period=month&start=2024-02-15&end=2024-12-31"
+    ).get_json()
+    assert stats == [{"period": "month", "bucket": "2024-03-01", "count": 1}]
+    assert client.get("/api/v1/users/stats?period=year").status_code == 422
+
+
+def test_rebuild_replaces_existing_rollups(app):
+    db.session.add(User(username="alice", email="alice@example.com"))
+    db.session.add(UserSignupRollup(period="day", bucket=datetime.date(2000, 1, 1),
+                                    count=42))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["user-stats", "rebuild"])
+    assert result.exit_code == 0
+    rollups = db.session.scalars(db.select(UserSignupRollup)).all()
+    assert {r.period for r in rollups} == {"day", "week", "month"}
+    assert all(r.count == 1 for r in rollups)